@@ -1,3 +1,3 @@
 """Language Server Protocol implementation for annotation tool."""
 
-__version__ = "0.1.0"
+from .__about__ import __version__
@@ -1,22 +1,67 @@
 import argparse
+import os
 import sys
 from typing import List, Optional
-from . import server as py_server
-from . import __version__
 
+# 与 _build_parser().format_help() 的输出一致，由 tests/test_cli.py 校验
+_HELP = """usage: {prog} [-h] [--version] [--connection {{stdio,tcp}}] [--host HOST] [--port PORT]
 
-def main(argv: Optional[List[str]] = None) -> int:
+Language Server for Annotation Tool
+
+options:
+  -h, --help            show this help message and exit
+  --version             show program's version number and exit
+  --connection {{stdio,tcp}}
+                        Connection type (default: stdio)
+  --host HOST           Host for TCP connection (default: 127.0.0.1)
+  --port PORT           Port for TCP connection (default: 2087)
+"""
+
+
+class _VersionAction(argparse.Action):
+	"""仅在请求 --version 时才读取版本号的 argparse 动作。"""
+
+	def __init__(
+		self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None
+	):
+		super().__init__(
+			option_strings=option_strings, dest=dest, default=default, nargs=0, help=help
+		)
+
+	def __call__(self, parser, namespace, values, option_string=None):
+		from . import __version__
+
+		parser.exit(message=f"{parser.prog} {__version__}\n")
+
+
+def _sniff_fast_path(argv: List[str]) -> Optional[int]:
 	"""
-	解析命令行参数并启动注释工具的语言服务器。
+	在构建 argparse 解析器之前检查 `--help`/`--version`，命中时直接输出并返回退出码。
 
-	Args:
-		argv: 可选的命令行参数列表，默认为 None，表示使用 sys.argv。
+	未命中时返回 None，由调用方继续走完整的参数解析流程。
+	"""
+	for arg in argv:
+		if arg == "--":
+			break
+		if arg in ("-h", "--help"):
+			sys.stdout.write(_HELP.format(prog=os.path.basename(sys.argv[0])))
+			return 0
+		if arg == "--version":
+			from . import __version__
 
-	Returns:
-		程序执行完成后的退出码，正常情况下为 0。
+			sys.stdout.write(f"{os.path.basename(sys.argv[0])} {__version__}\n")
+			return 0
+	return None
+
+
+def _build_parser(prog: Optional[str] = None) -> argparse.ArgumentParser:
+	"""
+	构建命令行参数解析器；增删或修改选项时需同步更新 _HELP。
 	"""
-	parser = argparse.ArgumentParser(description="Language Server for Annotation Tool")
-	parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+	parser = argparse.ArgumentParser(prog=prog, description="Language Server for Annotation Tool")
+	parser.add_argument(
+		"--version", action=_VersionAction, help="show program's version number and exit"
+	)
 	parser.add_argument(
 		"--connection",
 		choices=["stdio", "tcp"],
@@ -31,9 +76,32 @@ def main(argv: Optional[List[str]] = None) -> int:
 	parser.add_argument(
 		"--port", type=int, default=2087, help="Port for TCP connection (default: 2087)"
 	)
-	args = parser.parse_args(argv)
+	return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	"""
+	解析命令行参数并启动注释工具的语言服务器。
+
+	`--help`/`--version` 由 `_sniff_fast_path` 直接处理，不会构建解析器；服务器模块只在参数解析完成后才导入。
+
+	Args:
+		argv: 可选的命令行参数列表，默认为 None，表示使用 sys.argv。
+
+	Returns:
+		程序执行完成后的退出码，正常情况下为 0。
+	"""
+	if argv is None:
+		argv = sys.argv[1:]
+	code = _sniff_fast_path(argv)
+	if code is not None:
+		return code
+
+	args = _build_parser().parse_args(argv)
 
 	# 启动服务器
+	from . import server as py_server
+
 	py_server.start_server(args.connection, args.host, args.port)
 	return 0
 
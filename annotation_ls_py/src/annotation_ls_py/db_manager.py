@@ -1,13 +1,147 @@
 #!/usr/bin/env python3
 
-import os
+import atexit
 import sqlite3
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict
-from urllib.parse import urlparse, unquote
-from .utils import *
-from .logger import error, info
+from typing import Callable, Optional, List, Dict, Iterator, Tuple
+from .utils import update_note_aid, uri_to_relative_path
+from .logger import error
+
+
+# 每个连接建立后执行的 PRAGMA，保持 SQLite 页缓存常驻并减少 fsync
+_CONNECTION_PRAGMAS = (
+	"PRAGMA journal_mode=WAL",
+	"PRAGMA synchronous=NORMAL",
+	"PRAGMA temp_store=MEMORY",
+	"PRAGMA cache_size=-20000",
+	"PRAGMA mmap_size=268435456",
+	# 限制 optimize 触发的 ANALYZE 每个索引扫描的行数，保证打开和关闭连接时耗时可控
+	"PRAGMA analysis_limit=1000",
+)
+
+# 热点查询语句，保持为模块级常量以便命中 sqlite3 的语句缓存
+_SQL_GET_FILE_ID = "SELECT id FROM files WHERE path = ?"
+_SQL_GET_NOTE_FILE = """
+	SELECT a.note_file
+	FROM annotations a
+	JOIN files f ON a.file_id = f.id
+	WHERE f.path = ? AND a.annotation_id = ?
+"""
+_SQL_GET_NOTE_FILES = """
+	SELECT a.note_file
+	FROM annotations a
+	JOIN files f ON a.file_id = f.id
+	WHERE f.path = ?
+	ORDER BY a.annotation_id
+"""
+_SQL_UPSERT_FILE = """
+	INSERT INTO files (path, last_modified) VALUES (?, datetime('now', 'localtime'))
+	ON CONFLICT(path) DO UPDATE SET last_modified = excluded.last_modified
+"""
+# RETURNING 需要 SQLite 3.35+，旧版本回退为额外的一次 SELECT
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+if _HAS_RETURNING:
+	_SQL_UPSERT_FILE += "RETURNING id\n"
+_SQL_INSERT_ANNOTATION = (
+	"INSERT INTO annotations (file_id, annotation_id, note_file) VALUES (?, ?, ?)"
+)
+_SQL_DELETE_ANNOTATION = """
+	DELETE FROM annotations
+	WHERE file_id = (
+		SELECT id FROM files WHERE path = ?
+	) AND annotation_id = ?
+"""
+_SQL_SELECT_SHIFTED = """
+	SELECT annotation_id, note_file
+	FROM annotations
+	WHERE file_id = ? AND annotation_id >= ?
+"""
+_SQL_SHIFT_NEGATE = """
+	UPDATE annotations
+	SET annotation_id = -(annotation_id + ?)
+	WHERE file_id = ? AND annotation_id >= ?
+"""
+_SQL_SHIFT_RESTORE = """
+	UPDATE annotations
+	SET annotation_id = -annotation_id
+	WHERE file_id = ? AND annotation_id < 0
+"""
+
+# 数据库结构版本，记录在 PRAGMA user_version 中；修改表结构时递增并在 _migrate_schema 中处理
+_SCHEMA_VERSION = 1
+
+# 查询结果缓存的最大条目数
+_LOOKUP_CACHE_SIZE = 512
+
+# 所有存活的 DatabaseManager，用于在进程退出时关闭连接
+_managers: "weakref.WeakSet[DatabaseManager]" = weakref.WeakSet()
+
+
+def _migrate_schema(conn: sqlite3.Connection) -> None:
+	"""
+	按 `PRAGMA user_version` 建立或升级数据库结构。
+
+	结构已是最新版本时只执行一次 PRAGMA 查询；否则在 `BEGIN IMMEDIATE` 事务中执行建表语句并更新版本号，
+	多个进程同时打开同一数据库时只有一个会执行迁移。
+	"""
+	if conn.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+		return
+
+	conn.execute("BEGIN IMMEDIATE")
+	try:
+		if conn.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+			conn.execute("COMMIT")
+			return
+
+		# 创建必要的表
+		conn.execute("""
+			CREATE TABLE IF NOT EXISTS files (
+				id INTEGER PRIMARY KEY,
+				path TEXT UNIQUE,
+				last_modified TIMESTAMP
+			)
+		""")
+
+		conn.execute("""
+			CREATE TABLE IF NOT EXISTS annotations (
+				id INTEGER PRIMARY KEY,
+				file_id INTEGER,
+				annotation_id INTEGER,
+				note_file TEXT,
+				FOREIGN KEY (file_id) REFERENCES files (id),
+				UNIQUE (file_id, annotation_id)
+			)
+		""")
+
+		# 覆盖索引：按 (file_id, annotation_id) 查询 note_file 时无需回表
+		conn.execute(
+			"CREATE INDEX IF NOT EXISTS idx_annotations_file_aid "
+			"ON annotations (file_id, annotation_id, note_file)"
+		)
+		# files.path 的 UNIQUE 约束自带索引，按路径查询已经走该索引；删除旧版本建立的重复索引，
+		# 避免每次写入 files 时多维护一棵 B 树
+		conn.execute("DROP INDEX IF EXISTS idx_files_path")
+
+		conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+	except BaseException:
+		conn.execute("ROLLBACK")
+		raise
+	conn.execute("COMMIT")
+
+
+def _close_connection(conn: sqlite3.Connection) -> None:
+	"""
+	关闭连接前执行 `PRAGMA optimize`，根据本连接的查询情况更新过期的统计信息。
+	"""
+	try:
+		conn.execute("PRAGMA optimize")
+	except sqlite3.Error:
+		pass
+	conn.close()
 
 
 class DatabaseError(Exception):
@@ -23,10 +157,23 @@ class DatabaseManager:
 
 		如果提供了项目根路径，则自动初始化并连接对应的注释数据库。
 		"""
-		self.connections = {}  # 项目路径 -> sqlite3.Connection
+		# 数据库路径 -> sqlite3.Connection，按最近使用顺序排列
+		self.connections: "OrderedDict[str, sqlite3.Connection]" = OrderedDict()
 		self.current_db = None
 		self.project_root = None
 		self.max_connections = 5  # 最大保持的连接数
+		# (数据库路径, 相对路径, 标注ID) -> 笔记文件名；所有写操作都经过 transaction()，届时整体清空，
+		# 其他进程的写入通过 PRAGMA data_version 的变化发现
+		self._note_file_cache: "OrderedDict[Tuple[str, str, int], Optional[str]]" = OrderedDict()
+		# (数据库路径, 相对路径) -> 该文件的全部笔记文件名
+		self._note_files_cache: "OrderedDict[Tuple[str, str], Tuple[str, ...]]" = OrderedDict()
+		# (数据库路径, 相对路径) -> files 表中的 ID；文件记录只增不删，仅在事务回滚时清空
+		self._file_id_cache: Dict[Tuple[str, str], int] = {}
+		# 数据库路径 -> 上次查询缓存时该连接的 PRAGMA data_version
+		self._data_versions: Dict[str, int] = {}
+		# 外层事务提交后才执行的文件操作（如改写笔记），回滚时丢弃
+		self._after_commit: List[Callable[[], None]] = []
+		_managers.add(self)
 		if project_root:
 			self.init_db(project_root)
 
@@ -34,7 +181,7 @@ class DatabaseManager:
 		"""
 		初始化或连接指定项目根目录下的注释数据库。
 
-		如果数据库已连接则复用，否则创建新连接并确保所需的数据表存在。自动管理连接池，超出最大连接数时关闭最早的连接。
+		如果数据库已连接则复用，否则创建新连接并确保所需的数据表存在。自动管理连接池，超出最大连接数时关闭最久未使用的连接。
 		"""
 		self.project_root = project_root
 		db_path = self.project_root / ".annotation" / "db" / "annotations.db"
@@ -45,43 +192,42 @@ class DatabaseManager:
 
 		# 如果已经在连接池中，更新为当前连接
 		if str(db_path) in self.connections:
+			self.connections.move_to_end(str(db_path))
 			self.current_db = str(db_path)
 			return
 
 		# 创建新连接
 		db_path.parent.mkdir(parents=True, exist_ok=True)
-		conn = sqlite3.connect(str(db_path))
+		conn = sqlite3.connect(
+			str(db_path), check_same_thread=False, isolation_level=None, cached_statements=256
+		)
+		for pragma in _CONNECTION_PRAGMAS:
+			conn.execute(pragma)
 
-		# 创建必要的表
-		conn.execute("""
-			CREATE TABLE IF NOT EXISTS files (
-				id INTEGER PRIMARY KEY,
-				path TEXT UNIQUE,
-				last_modified TIMESTAMP
-			)
-		""")
-
-		conn.execute("""
-			CREATE TABLE IF NOT EXISTS annotations (
-				id INTEGER PRIMARY KEY,
-				file_id INTEGER,
-				annotation_id INTEGER,
-				note_file TEXT,
-				FOREIGN KEY (file_id) REFERENCES files (id),
-				UNIQUE (file_id, annotation_id)
-			)
-		""")
-
-		conn.commit()
+		_migrate_schema(conn)
+		# 0x10000 让 optimize 检查所有表，而不只是本连接用过的表；统计信息未过期时不会重新分析
+		conn.execute("PRAGMA optimize=0x10002")
 
 		# 管理连接池大小
 		if len(self.connections) >= self.max_connections:
-			oldest_conn = next(iter(self.connections.values()))
-			oldest_conn.close()
-			del self.connections[next(iter(self.connections))]
+			_, oldest_conn = self.connections.popitem(last=False)
+			_close_connection(oldest_conn)
 
 		self.connections[str(db_path)] = conn
 		self.current_db = str(db_path)
+		# data_version 只在同一连接内可比较
+		self._data_versions.pop(str(db_path), None)
+
+	def close(self) -> None:
+		"""
+		关闭连接池中的所有数据库连接。
+		"""
+		while self.connections:
+			_, conn = self.connections.popitem()
+			_close_connection(conn)
+		self.current_db = None
+		self._file_id_cache.clear()
+		self._data_versions.clear()
 
 	def _get_conn(self) -> sqlite3.Connection:
 		"""
@@ -91,8 +237,91 @@ class DatabaseManager:
 		"""
 		if not self.current_db or self.current_db not in self.connections:
 			raise DatabaseError("No database connection")
+		self.connections.move_to_end(self.current_db)
 		return self.connections[self.current_db]
 
+	def _clear_lookup_cache(self) -> None:
+		"""
+		清空笔记文件查询缓存。
+		"""
+		self._note_file_cache.clear()
+		self._note_files_cache.clear()
+
+	def _sync_data_version(self, conn: sqlite3.Connection) -> None:
+		"""
+		检查当前数据库是否被其他连接修改过，是则清空查询缓存。
+
+		其他进程（如另一个编辑器中的语言服务器）共享同一数据库时，它们提交的写入不经过本进程的
+		transaction()，只能通过 PRAGMA data_version 的变化发现。
+		"""
+		version = conn.execute("PRAGMA data_version").fetchone()[0]
+		if self._data_versions.get(self.current_db) != version:
+			self._clear_lookup_cache()
+			self._data_versions[self.current_db] = version
+
+	@staticmethod
+	def _cache_put(cache: OrderedDict, key, value) -> None:
+		cache[key] = value
+		if len(cache) > _LOOKUP_CACHE_SIZE:
+			cache.popitem(last=False)
+
+	@contextmanager
+	def transaction(self) -> Iterator[sqlite3.Connection]:
+		"""
+		在一个 `BEGIN IMMEDIATE` 事务中执行多次写操作，退出时只提交一次。
+
+		已处于事务中时直接复用外层事务，因此可以嵌套使用；发生异常（包括 COMMIT 失败）时回滚。
+		进入事务以及外层事务结束时都会清空查询缓存，避免缓存到未提交或已回滚的数据。
+		提交成功后依次执行通过 _after_commit 登记的回调。
+		"""
+		conn = self._get_conn()
+		self._clear_lookup_cache()
+		if conn.in_transaction:
+			yield conn
+			return
+
+		conn.execute("BEGIN IMMEDIATE")
+		try:
+			yield conn
+			conn.execute("COMMIT")
+		except BaseException:
+			# COMMIT 失败（如 SQLITE_BUSY）时事务仍处于打开状态，必须回滚，否则之后的事务会嵌套进去
+			if conn.in_transaction:
+				conn.execute("ROLLBACK")
+			# 回滚可能撤销了事务中新插入并缓存的文件记录
+			self._file_id_cache.clear()
+			self._after_commit.clear()
+			raise
+		finally:
+			self._clear_lookup_cache()
+
+		callbacks, self._after_commit = self._after_commit, []
+		for callback in callbacks:
+			try:
+				callback()
+			except Exception as e:
+				error(f"Failed to run post-commit action: {str(e)}")
+
+	def _in_transaction(self) -> bool:
+		"""
+		判断当前数据库连接是否处于事务中。
+		"""
+		conn = self.connections.get(self.current_db) if self.current_db else None
+		return conn is not None and conn.in_transaction
+
+	def _get_file_id(self, conn: sqlite3.Connection, relative_path: str) -> Optional[int]:
+		"""
+		返回指定相对路径在 files 表中的 ID，结果按数据库缓存；文件记录不存在时返回 None。
+		"""
+		key = (self.current_db, relative_path)
+		file_id = self._file_id_cache.get(key)
+		if file_id is None:
+			result = conn.execute(_SQL_GET_FILE_ID, (relative_path,)).fetchone()
+			if not result:
+				return None
+			file_id = self._file_id_cache[key] = result[0]
+		return file_id
+
 	def _uri_to_relative_path(self, uri: str) -> str:
 		"""
 		将 URI 转换为相对于项目根目录的路径。
@@ -102,15 +331,7 @@ class DatabaseManager:
 		if not self.project_root:
 			raise DatabaseError("Project root not set")
 
-		parsed = urlparse(uri)
-		path = Path(unquote(parsed.path))
-		if os.name == "nt" and str(path).startswith("/"):
-			path = Path(str(path)[1:])
-
-		try:
-			return str(path.relative_to(self.project_root))
-		except ValueError:
-			return str(path)
+		return str(uri_to_relative_path(uri, self.project_root))
 
 	def get_annotation_note_file(self, file_uri: str, annotation_id: int) -> Optional[str]:
 		"""
@@ -127,18 +348,18 @@ class DatabaseManager:
 			conn = self._get_conn()
 			relative_path = self._uri_to_relative_path(file_uri)
 
-			cursor = conn.execute(
-				"""
-				SELECT a.note_file
-				FROM annotations a
-				JOIN files f ON a.file_id = f.id
-				WHERE f.path = ? AND a.annotation_id = ?
-			""",
-				(relative_path, annotation_id),
-			)
+			self._sync_data_version(conn)
+			key = (self.current_db, relative_path, annotation_id)
+			if key in self._note_file_cache:
+				self._note_file_cache.move_to_end(key)
+				return self._note_file_cache[key]
+
+			cursor = conn.execute(_SQL_GET_NOTE_FILE, (relative_path, annotation_id))
 
 			result = cursor.fetchone()
-			return result[0] if result else None
+			note_file = result[0] if result else None
+			self._cache_put(self._note_file_cache, key, note_file)
+			return note_file
 
 		except Exception as e:
 			error(f"Failed to get annotation note file: {str(e)}")
@@ -159,31 +380,19 @@ class DatabaseManager:
 			DatabaseError: 创建标注记录失败时抛出。
 		"""
 		try:
-			conn = self._get_conn()
 			relative_path = self._uri_to_relative_path(doc_uri)
 
-			# 获取或创建文件记录
-			cursor = conn.execute(
-				"INSERT OR IGNORE INTO files (path, last_modified) VALUES (?, ?)",
-				(relative_path, datetime.now()),
-			)
-			conn.execute(
-				"UPDATE files SET last_modified = ? WHERE path = ?",
-				(datetime.now(), relative_path),
-			)
+			note_file = f"note_{datetime.now():%Y%m%d_%H%M%S}.md"
 
-			# 获取文件ID
-			cursor = conn.execute("SELECT id FROM files WHERE path = ?", (relative_path,))
-			file_id = cursor.fetchone()[0]
+			with self.transaction() as conn:
+				# 获取或创建文件记录，同时取得文件ID
+				cursor = conn.execute(_SQL_UPSERT_FILE, (relative_path,))
+				if not _HAS_RETURNING:
+					cursor = conn.execute(_SQL_GET_FILE_ID, (relative_path,))
+				file_id = cursor.fetchone()[0]
+				self._file_id_cache[(self.current_db, relative_path)] = file_id
 
-			# 生成笔记文件名
-			now = datetime.now()
-			note_file = f"note_{now.strftime('%Y%m%d_%H%M%S')}.md"
-			conn.execute(
-				"INSERT INTO annotations (file_id, annotation_id, note_file) VALUES (?, ?, ?)",
-				(file_id, annotation_id, note_file),
-			)
-			conn.commit()
+				conn.execute(_SQL_INSERT_ANNOTATION, (file_id, annotation_id, note_file))
 
 			return note_file
 
@@ -205,18 +414,17 @@ class DatabaseManager:
 			conn = self._get_conn()
 			relative_path = self._uri_to_relative_path(source_uri)
 
-			cursor = conn.execute(
-				"""
-				SELECT a.note_file
-				FROM annotations a
-				JOIN files f ON a.file_id = f.id
-				WHERE f.path = ?
-				ORDER BY a.annotation_id
-			""",
-				(relative_path,),
-			)
+			self._sync_data_version(conn)
+			key = (self.current_db, relative_path)
+			note_files = self._note_files_cache.get(key)
+			if note_files is None:
+				cursor = conn.execute(_SQL_GET_NOTE_FILES, (relative_path,))
+				note_files = tuple(row[0] for row in cursor.fetchall())
+				self._cache_put(self._note_files_cache, key, note_files)
+			else:
+				self._note_files_cache.move_to_end(key)
 
-			return [{"note_file": row[0]} for row in cursor.fetchall()]
+			return [{"note_file": note_file} for note_file in note_files]
 
 		except Exception as e:
 			error(f"Failed to get file annotations: {str(e)}")
@@ -232,25 +440,19 @@ class DatabaseManager:
 
 		Returns:
 			若成功删除标注记录则返回 True，否则返回 False。
+			在外层事务中调用时，失败会抛出异常，由外层事务回滚。
 		"""
+		nested = self._in_transaction()
 		try:
-			conn = self._get_conn()
 			relative_path = self._uri_to_relative_path(file_uri)
 
-			cursor = conn.execute(
-				"""
-				DELETE FROM annotations
-				WHERE file_id = (
-					SELECT id FROM files WHERE path = ?
-				) AND annotation_id = ?
-			""",
-				(relative_path, annotation_id),
-			)
-
-			conn.commit()
+			with self.transaction() as conn:
+				cursor = conn.execute(_SQL_DELETE_ANNOTATION, (relative_path, annotation_id))
 			return cursor.rowcount > 0
 
 		except Exception as e:
+			if nested:
+				raise
 			error(f"Failed to delete annotation: {str(e)}")
 			return False
 
@@ -265,55 +467,46 @@ class DatabaseManager:
 
 		Returns:
 			操作成功返回True，否则返回False。
+			在外层事务中调用时，失败会抛出异常，由外层事务回滚。
+			笔记文件中的标注ID在外层事务提交后才改写。
 		"""
+		nested = self._in_transaction()
 		try:
-			conn = self._get_conn()
 			relative_path = self._uri_to_relative_path(file_uri)
 
-			# 获取文件ID
-			cursor = conn.execute("SELECT id FROM files WHERE path = ?", (relative_path,))
-			result = cursor.fetchone()
-			if not result:
-				return False
-
-			file_id = result[0]
-
-			cursor.execute(
-				"""
-				SELECT annotation_id, note_file
-				FROM annotations
-				WHERE file_id = ? AND annotation_id >= ?
-				ORDER BY annotation_id DESC
-			""",
-				(file_id, from_id),
-			)
+			with self.transaction() as conn:
+				# 获取文件ID
+				file_id = self._get_file_id(conn, relative_path)
+				if file_id is None:
+					return False
+
+				annotation_ids = conn.execute(_SQL_SELECT_SHIFTED, (file_id, from_id)).fetchall()
+
+				# UNIQUE(file_id, annotation_id) 按行检查，先整体平移到负数区间，再翻回正数，
+				# 用两条语句完成全部更新而不会产生中间冲突
+				conn.execute(_SQL_SHIFT_NEGATE, (increment, file_id, from_id))
+				conn.execute(_SQL_SHIFT_RESTORE, (file_id,))
+
+				# 同步笔记文件中的标注ID
+				notes_dir = Path(self.project_root) / ".annotation" / "notes"
+
+				def sync_notes() -> None:
+					for annotation_id, note_file in annotation_ids:
+						update_note_aid(notes_dir / note_file, annotation_id + increment)
+
+				self._after_commit.append(sync_notes)
 
-			annotation_ids = cursor.fetchall()
-
-			# 更新标注ID
-			if increment < 0:
-				annotation_ids.reverse()
-
-			for annotation_id, note_file in annotation_ids:
-				info(f"Updating annotation {annotation_id} for {note_file}")
-				cursor.execute(
-					"""
-					UPDATE annotations
-					SET annotation_id = annotation_id + ?
-					WHERE file_id = ? AND annotation_id = ?
-				""",
-					(increment, file_id, annotation_id),
-				)
-				if not self.project_root:
-					raise Exception("Project root not set")
-				update_note_aid(
-					Path(self.project_root) / ".annotation" / "notes" / note_file,
-					annotation_id + increment,
-				)
-
-			conn.commit()
 			return True
 
 		except Exception as e:
+			if nested:
+				raise
 			error(f"Failed to increase annotation ids: {str(e)}")
 			return False
+
+
+@atexit.register
+def _close_all_connections() -> None:
+	"""进程退出时关闭所有 DatabaseManager 持有的连接。"""
+	for manager in list(_managers):
+		manager.close()
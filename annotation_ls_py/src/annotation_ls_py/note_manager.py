@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 
 import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict
-from urllib.parse import urlparse, unquote
-import frontmatter
+from typing import Optional, Dict, Tuple
 
-from .logger import *
+from .logger import error
+from .utils import parse_note, read_frontmatter_head, uri_to_path, uri_to_relative_path
+
+# frontmatter 解析结果缓存的最大条目数
+_FRONTMATTER_CACHE_SIZE = 2048
 
 
 class NoteManager:
@@ -18,6 +22,10 @@ class NoteManager:
 		"""
 		self.project_root: Optional[Path] = None
 		self.notes_dir: Optional[Path] = None
+		# 笔记路径 -> (st_mtime_ns, st_size, 元数据, 正文)，按最近使用顺序排列
+		self._fm_cache: "OrderedDict[str, Tuple[int, int, Dict, str]]" = OrderedDict()
+		# 缓存可能被后台预热线程同时写入
+		self._fm_lock = threading.Lock()
 		if project_root:
 			self.init_project(project_root)
 
@@ -29,17 +37,76 @@ class NoteManager:
 		self.notes_dir = self.project_root / ".annotation" / "notes"
 		self.notes_dir.mkdir(parents=True, exist_ok=True)
 
+	def _load_cached(self, note_path: Path) -> Tuple[Dict, str]:
+		"""
+		解析笔记文件，返回 (frontmatter 元数据, 正文)。
+
+		本工具写出的简单头部由 parse_note 直接解析，其余情况回退到 frontmatter。
+		结果按文件的 mtime 和大小缓存，文件未变化时不再重新读取和解析；文件不存在时抛出异常。
+		"""
+		path = str(note_path)
+		try:
+			stat = os.stat(path)
+		except FileNotFoundError:
+			raise Exception("Note file does not exist")
+
+		with self._fm_lock:
+			cached = self._fm_cache.get(path)
+			if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+				self._fm_cache.move_to_end(path)
+				return cached[2], cached[3]
+
+		with open(path, "rb") as f:
+			data = f.read()
+		parsed = parse_note(data)
+		if parsed is None:
+			# 只有非简单头部才需要 frontmatter（及其依赖的 PyYAML），按需导入
+			import frontmatter
+
+			post = frontmatter.loads(data.decode("utf-8"))
+			parsed = post.metadata, post.content
+		metadata, content = parsed
+
+		with self._fm_lock:
+			self._fm_cache[path] = (stat.st_mtime_ns, stat.st_size, metadata, content)
+			self._fm_cache.move_to_end(path)
+			if len(self._fm_cache) > _FRONTMATTER_CACHE_SIZE:
+				self._fm_cache.popitem(last=False)
+		return metadata, content
+
+	def prewarm(self) -> int:
+		"""
+		预先解析 notes 目录下的笔记文件并填充缓存，返回成功解析的文件数。
+
+		供后台线程在初始化后调用，使首次悬停等请求无需冷读磁盘；最多解析缓存容量个文件，单个文件失败时直接跳过。
+		"""
+		if not self.notes_dir:
+			return 0
+
+		count = 0
+		try:
+			with os.scandir(self.notes_dir) as entries:
+				for entry in entries:
+					if count >= _FRONTMATTER_CACHE_SIZE:
+						break
+					if not entry.name.endswith(".md") or not entry.is_file():
+						continue
+					try:
+						self._load_cached(Path(entry.path))
+						count += 1
+					except Exception:
+						continue
+		except OSError:
+			pass
+		return count
+
 	def _uri_to_path(self, uri: str) -> Path:
 		"""
 		将 URI 字符串转换为本地文件系统的 Path 对象。
 
 		在 Windows 系统上，如果路径以斜杠开头，会自动去除首个斜杠以保证路径格式正确。
 		"""
-		parsed = urlparse(uri)
-		path = unquote(parsed.path)
-		if os.name == "nt" and path.startswith("/"):
-			path = path[1:]
-		return Path(path)
+		return uri_to_path(uri)
 
 	def _uri_to_relative_path(self, uri: str) -> Path:
 		"""
@@ -50,11 +117,7 @@ class NoteManager:
 		if not self.project_root:
 			raise Exception("Project root not set")
 
-		path = self._uri_to_path(uri)
-		try:
-			return path.relative_to(self.project_root)
-		except ValueError:
-			return path
+		return uri_to_relative_path(uri, self.project_root)
 
 	def uri_to_path(self, uri: str) -> str:
 		"""
@@ -93,13 +156,11 @@ class NoteManager:
 			note_path = self.notes_dir / note_file
 			note_path.parent.mkdir(parents=True, exist_ok=True)
 
-			with note_path.open("w", encoding="utf-8") as f:
-				f.write(f"---\nfile: {relative_path}\nid: {annotation_id}\n---\n\n")
-				f.write("## Selected Text\n")
-				f.write("```\n")
-				f.write(text)
-				f.write("\n```\n")
-				f.write("## Notes\n")
+			note_path.write_text(
+				f"---\nfile: {relative_path}\nid: {annotation_id}\n---\n\n"
+				f"## Selected Text\n```\n{text}\n```\n## Notes\n",
+				encoding="utf-8",
+			)
 
 			return str(note_path)
 
@@ -137,6 +198,8 @@ class NoteManager:
 				raise Exception("Note file does not exist")
 
 			note_path.unlink()
+			with self._fm_lock:
+				self._fm_cache.pop(str(note_path), None)
 			return True
 
 		except Exception as e:
@@ -157,12 +220,9 @@ class NoteManager:
 			if not self.notes_dir:
 				raise Exception("Notes directory not set")
 
-			note_path = self.notes_dir / note_file
-			if not note_path.exists():
-				raise Exception("Note file does not exist")
-
-			post = frontmatter.load(str(note_path))
-			return post.metadata
+			metadata, _ = self._load_cached(self.notes_dir / note_file)
+			# 返回副本，避免调用方修改缓存中的元数据
+			return dict(metadata)
 
 		except Exception as e:
 			error(f"Failed to read note file: {str(e)}")
@@ -182,12 +242,8 @@ class NoteManager:
 			if not self.notes_dir:
 				raise Exception("Notes directory not set")
 
-			note_path = self.notes_dir / note_file
-			if not note_path.exists():
-				raise Exception("Note file does not exist")
-
-			post = frontmatter.load(str(note_path))
-			return post.content
+			_, content = self._load_cached(self.notes_dir / note_file)
+			return content
 
 		except Exception as e:
 			error(f"Failed to read note file: {str(e)}")
@@ -209,9 +265,11 @@ class NoteManager:
 			# 检查路径是否在笔记目录下
 			note_path.relative_to(self.notes_dir)
 
-			# 读取笔记内容获取 annotation id
-			post = frontmatter.load(str(note_path))
-			result = post.metadata.get("id")
+			# 读取笔记头部获取 annotation id
+			metadata = read_frontmatter_head(note_path)
+			if metadata is None:
+				metadata, _ = self._load_cached(note_path)
+			result = metadata.get("id")
 			if result is None:
 				raise Exception("Annotation id not found")
 			return int(str(result))
@@ -237,9 +295,11 @@ class NoteManager:
 			# 检查路径是否在笔记目录下
 			note_path.relative_to(self.notes_dir)
 
-			# 读取笔记内容
-			post = frontmatter.load(str(note_path))
-			source_path = post.metadata.get("file")
+			# 读取笔记头部
+			metadata = read_frontmatter_head(note_path)
+			if metadata is None:
+				metadata, _ = self._load_cached(note_path)
+			source_path = metadata.get("file")
 			if not source_path:
 				return None
 
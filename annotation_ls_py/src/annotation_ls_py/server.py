@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
+import os
+import threading
 from typing import Dict, Optional, List
 
 from pygls.server import LanguageServer
 from lsprotocol import types
 
-from .config import initialize_config
+from .config import get_config, initialize_config
 from .workspace_manager import workspace_manager
 from .utils import *
 from .logger import *
@@ -24,6 +26,16 @@ class AnnotationServer(LanguageServer):
 server = AnnotationServer()
 
 
+def _prewarm_notes(workspaces: List) -> None:
+	"""
+	依次预热各工作区的笔记缓存，在后台线程中执行。
+
+	NoteManager.prewarm 自行忽略读取错误，这里不向客户端发送日志，避免在事件循环之外调用 show_message。
+	"""
+	for workspace in workspaces:
+		workspace.note_manager.prewarm()
+
+
 @server.feature(types.INITIALIZE)
 def initialize(params: types.InitializeParams) -> types.InitializeResult:
 	"""
@@ -47,11 +59,18 @@ def initialize(params: types.InitializeParams) -> types.InitializeResult:
 	root_uri = params.root_uri
 	if root_uri:
 		info(f"Building workspace tree from root: {root_uri}")
-		workspace_manager.add_workspace(root_uri)
+		root_workspace = workspace_manager.add_workspace(root_uri)
+		if root_workspace:
+			# 在后台线程中预热笔记缓存，不阻塞初始化响应
+			threading.Thread(
+				target=_prewarm_notes,
+				args=(root_workspace.get_subtree_workspaces(),),
+				daemon=True,
+			).start()
 
 	capabilities = types.ServerCapabilities(
 		text_document_sync=types.TextDocumentSyncOptions(
-			open_close=True, change=types.TextDocumentSyncKind.Full, save=True
+			open_close=True, change=types.TextDocumentSyncKind.Incremental, save=True
 		),
 		hover_provider=True,
 		execute_command_provider=types.ExecuteCommandOptions(
@@ -94,19 +113,19 @@ def did_open(params: types.DidOpenTextDocumentParams):
 	"""
 	处理文档打开事件。
 
-	当文档被打开时，显示包含文档 URI 的提示消息。
+	重新打开的文档版本号可能从头开始计数，与缓存中关闭前的版本号重合，因此丢弃该文档缓存的标注区间。
 	"""
-	server.show_message(f"Document opened: {params.text_document.uri}")
+	invalidate_annotation_ranges(params.text_document.uri)
 
 
-@server.feature(types.TEXT_DOCUMENT_DID_CHANGE)
-def did_change(params: types.DidChangeTextDocumentParams):
+@server.feature(types.TEXT_DOCUMENT_DID_CLOSE)
+def did_close(params: types.DidCloseTextDocumentParams):
 	"""
-	处理文档内容变更事件。
+	处理文档关闭事件。
 
-	在文档发生更改时触发，显示变更文档的 URI 信息。
+	关闭后文档可能在磁盘上被修改，再次打开时版本号又从头开始，因此丢弃该文档缓存的标注区间。
 	"""
-	server.show_message(f"Document changed: {params.text_document.uri}")
+	invalidate_annotation_ranges(params.text_document.uri)
 
 
 @server.feature(types.TEXT_DOCUMENT_HOVER)
@@ -173,15 +192,11 @@ def document_highlight(
 		position = params.position
 
 		# 获取光标位置的标注
-		annotation_id = get_annotation_at_position(doc, position)
-		if annotation_id is None:
+		located = locate_annotation(doc, position)
+		if located is None:
 			return None
 
-		annotations = find_annotation_Ranges(doc)
-		if annotations is None:
-			raise Exception("Failed to get annotation ranges")
-
-		current_annotation_range = annotations[annotation_id - 1]
+		_, current_annotation_range = located
 
 		# 返回标注范围的高亮
 		return [types.DocumentHighlight(range=current_annotation_range)]
@@ -232,12 +247,14 @@ def create_annotation(ls: LanguageServer, params: Dict) -> Optional[Dict]:
 			raise Exception(f"No workspace found for {doc.uri}")
 		db_manager = workspace.db_manager
 		note_manager = workspace.note_manager
-		db_manager.increase_annotation_ids(doc.uri, annotation_id)
 
-		# 创建标注
-		note_file = db_manager.create_annotation(doc.uri, annotation_id)
+		# 腾出 ID 并创建标注，两步在同一事务中提交
+		with db_manager.transaction():
+			db_manager.increase_annotation_ids(doc.uri, annotation_id)
+			note_file = db_manager.create_annotation(doc.uri, annotation_id)
 
 		# 在原文中插入日语半角括号
+		config = get_config()
 		edits = [
 			types.TextEdit(
 				range=types.Range(start=selection_range.start, end=selection_range.start),
@@ -286,9 +303,10 @@ def delete_annotation(ls: LanguageServer, params: Dict) -> Dict:
 			line=params["position"]["line"], character=params["position"]["character"]
 		)
 		logger.info("uri:" + params["textDocument"]["uri"])
-		annotation_id = get_annotation_at_position(doc, position)
-		if annotation_id is None:
+		located = locate_annotation(doc, position)
+		if located is None:
 			raise Exception("Failed to get annotation_id")
+		annotation_id, current_annotation_range = located
 
 		# 获取工作区
 		workspace = workspace_manager.get_workspace(doc.uri)
@@ -302,15 +320,13 @@ def delete_annotation(ls: LanguageServer, params: Dict) -> Dict:
 		if not note_file:
 			raise Exception("Annotation not found")
 
-		# 删除标注记录
-		if not db_manager.delete_annotation(doc.uri, annotation_id):
-			raise Exception("Failed to delete annotation in database")
-
-		annotations = find_annotation_Ranges(doc)
-		if annotations is None:
-			raise Exception("Failed to get annotation ranges")
-
-		current_annotation_range = annotations[annotation_id - 1]
+		# 删除标注记录并前移后续标注的 ID，两步在同一事务中提交
+		with db_manager.transaction():
+			if not db_manager.delete_annotation(doc.uri, annotation_id):
+				raise Exception("Failed to delete annotation in database")
+			# 刚删除的标注所在文件必然有记录，返回 False 说明平移失败，需要整体回滚
+			if not db_manager.increase_annotation_ids(doc.uri, annotation_id, -1):
+				raise Exception("Failed to shift annotation ids in database")
 
 		edits = [
 			types.TextEdit(
@@ -338,8 +354,6 @@ def delete_annotation(ls: LanguageServer, params: Dict) -> Dict:
 		edit = types.WorkspaceEdit(changes={doc.uri: edits})
 		ls.apply_edit(edit)
 
-		db_manager.increase_annotation_ids(doc.uri, annotation_id, -1)
-
 		# 删除笔记文件
 		note_manager.delete_note(note_file)
 
@@ -523,14 +537,14 @@ def get_annotation_source(ls: LanguageServer, params: List[Dict]) -> Optional[Di
 			return None
 
 		source = ls.workspace.get_document(source_path)
-		annotations = find_annotation_Ranges(source)
+		annotations = find_annotation_ranges(source)
 		if annotations is None:
 			raise Exception("Failed to get annotation ranges")
 
 		n = len(annotations)
 		# 计算目标索引
 		target_id = (n + (current_id - 1 + offset) % n) % n + 1
-		target_annotation = annotations[target_id - 1]
+		target_annotation = tuple_to_range(annotations[target_id - 1])
 
 		# 获取目标笔记文件
 		note_file = workspace.db_manager.get_annotation_note_file(source_path, target_id)
@@ -573,10 +587,8 @@ def query_annotations(ls: LanguageServer, params: Dict) -> List:
 		if query_scope == "current_workspace":
 			workspaces_to_query = [workspace]
 		elif query_scope == "current_project":
-			# 获取当前工作区的所有祖先工作区（包括自身）
-			ancestor_workspaces = workspace.get_ancestor_workspaces()
 			# 找到根工作区
-			root_workspace = ancestor_workspaces[-1] if ancestor_workspaces else workspace
+			root_workspace = workspace.get_root_workspace()
 			# 获取根工作区的所有子树工作区
 			workspaces_to_query = root_workspace.get_subtree_workspaces()
 		else:
@@ -592,18 +604,19 @@ def query_annotations(ls: LanguageServer, params: Dict) -> List:
 		for workspace in workspaces_to_query:
 			# 扫描工作区的 .annotation/notes 目录
 			notes_dir = workspace.note_manager.get_notes_dir()
-			if not notes_dir or not notes_dir.exists():
+			if not notes_dir:
 				continue
 
-			note_files = []
-
-			# 遍历所有 .md 文件
-			for note_file in notes_dir.glob("*.md"):
-				try:
-					note_files.append({"note_file": note_file.name})
-				except Exception as e:
-					error(f"Error reading note file {note_file}: {str(e)}")
-					continue
+			# 遍历所有 .md 文件，scandir 直接给出文件名，无需为每个条目构造 Path
+			try:
+				with os.scandir(notes_dir) as entries:
+					note_files = [
+						{"note_file": entry.name}
+						for entry in entries
+						if entry.name.endswith(".md") and entry.is_file()
+					]
+			except FileNotFoundError:
+				continue
 			if note_files:
 				res.append({"workspace_path": str(workspace.root_path), "note_files": note_files})
 
@@ -1,11 +1,89 @@
-from typing import List, Optional, Tuple
+import functools
+import os
+import re
+import sys
+from collections import OrderedDict
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 from pygls.workspace.text_document import TextDocument
 from lsprotocol import types
-from bisect import bisect_left
+from bisect import bisect_left, bisect_right
 from pathlib import Path
-import frontmatter
-from .config import config
-from .logger import *
+from urllib.parse import urlparse, unquote
+from .config import get_config
+
+if TYPE_CHECKING:
+	# frontmatter 会连带导入 PyYAML，运行时只在回退路径中按需导入
+	import frontmatter
+
+_IS_WINDOWS = os.name == "nt"
+
+# 与 str.splitlines 相同的换行规则，保证行号与 doc.lines 一致
+_LINE_BREAK_RE = re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+# 笔记中 “## Notes” 标题所在的整行（允许行首尾空白）
+_NOTES_HEADING_RE = re.compile(r"^[^\S\n]*## Notes[^\S\n]*$", re.MULTILINE)
+# \n 以外的换行符（CRLF 中的 \r 等）
+_NON_LF_BREAK_RE = re.compile(r"[\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+AnnotationTuple = Tuple[int, int, int, int]
+# (按右括号顺序的区间, 按左括号顺序排序的区间, 排序后每个区间直接外层区间的下标，无外层为 -1)
+AnnotationRanges = Tuple[Tuple[AnnotationTuple, ...], Tuple[AnnotationTuple, ...], Tuple[int, ...]]
+
+# 文档版本：打开的文档为编辑器给出的版本号，未打开的文档为磁盘文件的 (st_mtime_ns, st_size)
+DocumentVersion = Union[int, Tuple[int, int]]
+
+# 文档 URI -> (文档版本, 括号配置, 扫描结果)，按最近使用顺序排列
+_RANGES_CACHE_SIZE = 128
+_RangesCacheEntry = Tuple[DocumentVersion, Tuple[str, str], Optional[AnnotationRanges]]
+_ranges_cache: "OrderedDict[str, _RangesCacheEntry]" = OrderedDict()
+
+# 快速读取 frontmatter 时最多读取的字节数
+_FRONTMATTER_HEAD_LIMIT = 4096
+# 出现在值开头时需要完整 YAML 解析的字符
+_YAML_INDICATORS = tuple("'\"[]{}&*!|>%@`#")
+_YAML_INDICATOR_BYTES = tuple(c.encode() for c in _YAML_INDICATORS)
+# YAML 会解析为十进制整数的值（前导 0 在 YAML 1.1 中表示八进制，不在此列）
+_YAML_DECIMAL_RE = re.compile(r"[-+]?(?:0|[1-9][0-9]*)\Z")
+# YAML 1.1 中会被解析为布尔值或 null 的单词
+_YAML_SPECIAL_WORDS = frozenset(("y", "n", "yes", "no", "on", "off", "true", "false", "null"))
+# 普通值中会改变 YAML 解析结果的片段：空白后的注释、空白或行尾前的冒号
+_YAML_UNSAFE_RE = re.compile(r"[ \t]#|:(?:[ \t]|\Z)")
+
+# 笔记文件路径 -> (st_mtime_ns, st_size, 解析后的 Post)，按最近使用顺序排列
+_NOTE_POST_CACHE_SIZE = 256
+_note_post_cache: "OrderedDict[str, Tuple[int, int, frontmatter.Post]]" = OrderedDict()
+
+
+@functools.lru_cache(maxsize=4096)
+def uri_to_path(uri: str) -> Path:
+	"""
+	将 URI 字符串转换为本地文件系统的 Path 对象，结果按 URI 缓存。
+
+	常见的 `file:///...` URI 直接截取路径部分，其余形式（带主机名、查询串等）回退到 urlparse。
+	在 Windows 系统上，如果路径以斜杠开头，会自动去除首个斜杠以保证路径格式正确。
+	"""
+	if uri.startswith("file:///") and "?" not in uri and "#" not in uri:
+		path = unquote(uri[7:])
+	else:
+		path = unquote(urlparse(uri).path)
+	if _IS_WINDOWS and path.startswith("/"):
+		path = path[1:]
+	return Path(path)
+
+
+@functools.lru_cache(maxsize=512)
+def uri_to_relative_path(uri: str, project_root: Path) -> Path:
+	"""
+	将 URI 转换为相对于 project_root 的路径，结果按 (uri, project_root) 缓存。
+
+	如果 URI 对应的路径不在 project_root 下，则返回其绝对路径。
+	"""
+	path = uri_to_path(uri)
+	try:
+		return path.relative_to(project_root)
+	except ValueError:
+		return path
 
 
 def tuple_to_range(origin: Tuple[int, int, int, int]) -> types.Range:
@@ -24,53 +102,152 @@ def tuple_to_range(origin: Tuple[int, int, int, int]) -> types.Range:
 	)
 
 
-def find_annotation_ranges_raw(
-	doc: TextDocument,
-) -> Optional[List[Tuple[int, int, int, int]]]:
+def _line_starts(text: str, max_line: Optional[int] = None) -> List[int]:
 	"""
-	扫描文档，查找由配置括号包围的所有标注区间。
+	返回文本每一行起始位置的偏移量列表，分行规则与 str.splitlines 一致。
 
-	遍历文档内容，按右括号出现顺序返回每个标注区间的起止行列元组列表。如果括号不匹配，返回 None。
+	指定 max_line 时只扫描到该行的行尾为止，结果包含第 0 行到第 max_line + 1 行的起始位置。
+	"""
+	line_starts = [0]
+	breaks = _LINE_BREAK_RE.finditer(text)
+	if max_line is not None:
+		breaks = islice(breaks, max_line + 1)
+	line_starts.extend(m.end() for m in breaks)
+	return line_starts
 
-	返回:
-	    标注区间的四元组列表（起始行、起始列、结束行、结束列），或在括号不匹配时返回 None。
+
+@functools.lru_cache(maxsize=8)
+def _bracket_pattern(left_bracket: str, right_bracket: str) -> "re.Pattern[str]":
+	"""返回同时匹配左右括号的预编译正则。"""
+	return re.compile(f"{re.escape(left_bracket)}|{re.escape(right_bracket)}")
+
+
+@functools.lru_cache(maxsize=8)
+def _bracket_strip_table(left_bracket: str, right_bracket: str) -> Dict[int, None]:
+	"""返回用于 str.translate 删除左右括号字符的映射表。"""
+	return str.maketrans("", "", left_bracket + right_bracket)
+
+
+def _scan_annotation_ranges(
+	doc: TextDocument, left_bracket: str, right_bracket: str
+) -> Optional[List[AnnotationTuple]]:
 	"""
+	扫描文档，按右括号出现顺序返回所有标注区间；括号不匹配时返回 None。
+
+	括号查找由正则引擎在整个文档上完成，再通过行首偏移表二分得到行列号。
+	"""
+	text = doc.source
+	line_starts = _line_starts(text)
+
 	annotations = []
 	start_stack = []
-	lines = doc.lines
-
-	# 从服务器配置中获取括号
-	left_bracket = config.left_bracket
-	right_bracket = config.right_bracket
-
-	# 遍历每一行
-	for line_num, line in enumerate(lines):
-		for i, char in enumerate(line):
-			if char == left_bracket:
-				start_stack.append((line_num, i))
-			if char == right_bracket:
-				if start_stack == []:
-					return None
-				left_pos = start_stack.pop()
-				right_pos = (line_num, i)
-				annotations.append(left_pos + right_pos)
-	if start_stack != []:
+	for match in _bracket_pattern(left_bracket, right_bracket).finditer(text):
+		offset = match.start()
+		line_num = bisect_right(line_starts, offset) - 1
+		pos = (line_num, offset - line_starts[line_num])
+		if match.group() == left_bracket:
+			start_stack.append(pos)
+		else:
+			if not start_stack:
+				return None
+			annotations.append(start_stack.pop() + pos)
+	if start_stack:
 		return None
 	return annotations
 
 
+def _nesting_parents(annotations: Tuple[AnnotationTuple, ...]) -> Tuple[int, ...]:
+	"""
+	对按起点排序的区间，计算每个区间直接外层区间的下标（无外层为 -1）。
+	"""
+	parents = []
+	open_stack: List[int] = []
+	for i, annotation in enumerate(annotations):
+		start = annotation[:2]
+		while open_stack and annotations[open_stack[-1]][2:] < start:
+			open_stack.pop()
+		parents.append(open_stack[-1] if open_stack else -1)
+		open_stack.append(i)
+	return tuple(parents)
+
+
+def _disk_version(uri: str) -> Optional[Tuple[int, int]]:
+	"""
+	返回未打开文档对应磁盘文件的 (st_mtime_ns, st_size)，文件不可访问时返回 None。
+	"""
+	try:
+		stat = os.stat(uri_to_path(uri))
+	except (OSError, ValueError):
+		return None
+	return stat.st_mtime_ns, stat.st_size
+
+
+def get_cached_ranges(doc: TextDocument) -> Optional[AnnotationRanges]:
+	"""
+	返回文档的标注区间，同一文档版本只扫描一次。
+
+	结果为 (按右括号顺序的区间, 按左括号顺序排序的区间, 外层区间下标) 三个元组；括号不匹配时返回 None。
+	没有版本号的文档（未在编辑器中打开、直接从磁盘读取的文件）以磁盘文件的 mtime 和大小作为版本，无法获取时不做缓存。
+	"""
+	config = get_config()
+	brackets = (config.left_bracket, config.right_bracket)
+	version: Optional[DocumentVersion] = doc.version
+	if version is None:
+		version = _disk_version(doc.uri)
+
+	if version is not None:
+		cached = _ranges_cache.get(doc.uri)
+		if cached is not None and cached[0] == version and cached[1] == brackets:
+			_ranges_cache.move_to_end(doc.uri)
+			return cached[2]
+
+	raw = _scan_annotation_ranges(doc, *brackets)
+	if raw is None:
+		result = None
+	else:
+		annotation_L = tuple(sorted(raw))
+		result = (tuple(raw), annotation_L, _nesting_parents(annotation_L))
+
+	if version is not None:
+		_ranges_cache[doc.uri] = (version, brackets, result)
+		_ranges_cache.move_to_end(doc.uri)
+		if len(_ranges_cache) > _RANGES_CACHE_SIZE:
+			_ranges_cache.popitem(last=False)
+	return result
+
+
+def invalidate_annotation_ranges(uri: str) -> None:
+	"""
+	丢弃指定文档缓存的标注区间，在文档内容变化时调用。
+	"""
+	_ranges_cache.pop(uri, None)
+
+
+def find_annotation_ranges_raw(
+	doc: TextDocument,
+) -> Optional[Tuple[AnnotationTuple, ...]]:
+	"""
+	扫描文档，查找由配置括号包围的所有标注区间。
+
+	遍历文档内容，按右括号出现顺序返回每个标注区间的起止行列元组。如果括号不匹配，返回 None。
+
+	返回:
+	    标注区间的四元组元组（起始行、起始列、结束行、结束列），或在括号不匹配时返回 None。
+	"""
+	ranges = get_cached_ranges(doc)
+	return None if ranges is None else ranges[0]
+
+
 def find_annotation_ranges(
 	doc: TextDocument,
-) -> Optional[List[Tuple[int, int, int, int]]]:
+) -> Optional[Tuple[AnnotationTuple, ...]]:
 	"""
-	查找文档中所有标注区间，并按左括号出现顺序返回其位置元组列表。
+	查找文档中所有标注区间，并按左括号出现顺序返回其位置元组。
 
-	返回值为每个标注区间的起止位置元组（start_line, start_char, end_line, end_char）组成的列表，按左括号出现顺序排序；若未找到有效标注区间则返回 None。
+	返回值为每个标注区间的起止位置元组（start_line, start_char, end_line, end_char），按左括号出现顺序排序；若未找到有效标注区间则返回 None。
 	"""
-	annotations = find_annotation_ranges_raw(doc)
-	if annotations is None:
-		return None
-	return sorted(annotations)
+	ranges = get_cached_ranges(doc)
+	return None if ranges is None else ranges[1]
 
 
 def find_annotation_Ranges(doc: TextDocument) -> Optional[List[types.Range]]:
@@ -85,6 +262,15 @@ def find_annotation_Ranges(doc: TextDocument) -> Optional[List[types.Range]]:
 	return [tuple_to_range(t) for t in annotations]
 
 
+def _offset_at(line_starts: List[int], text_length: int, position: types.Position) -> int:
+	"""
+	将行列位置转换为文档中的字符偏移量；列号超出行尾时截断到该行末尾（含换行符）。
+	"""
+	line = position.line
+	line_end = line_starts[line + 1] if line + 1 < len(line_starts) else text_length
+	return min(line_starts[line] + position.character, line_end)
+
+
 def get_text_in_range(doc: TextDocument, selection_range: types.Range) -> str:
 	# 获取选中的文本
 	"""
@@ -96,32 +282,17 @@ def get_text_in_range(doc: TextDocument, selection_range: types.Range) -> str:
 	Returns:
 		去除左右括号后的选中文本内容，支持单行和多行选择。
 	"""
-	lines = doc.lines
-	if selection_range.start.line == selection_range.end.line:
-		# 单行选择
-		line = lines[selection_range.start.line]
-		selected_text = "".join(
-			c
-			for c in line[selection_range.start.character : selection_range.end.character]
-			if c != config.left_bracket and c != config.right_bracket
-		)
-	else:
-		# 多行选择
-		selected_text = []
-		for i in range(selection_range.start.line, selection_range.end.line + 1):
-			if i == selection_range.start.line:
-				line = lines[i][selection_range.start.character :]
-			elif i == selection_range.end.line:
-				line = lines[i][: selection_range.end.character]
-			else:
-				line = lines[i]
-			# 过滤掉半角括号
-			filtered_line = "".join(
-				c for c in line if c != config.left_bracket and c != config.right_bracket
-			)
-			selected_text.append(filtered_line)
-		selected_text = "".join(selected_text)
-	return selected_text
+	config = get_config()
+	text = doc.source
+	# 只需要扫描到选区最后一行的行尾
+	line_starts = _line_starts(text, selection_range.end.line)
+	start = _offset_at(line_starts, len(text), selection_range.start)
+	end = _offset_at(line_starts, len(text), selection_range.end)
+
+	# 过滤掉半角括号
+	return text[start:end].translate(
+		_bracket_strip_table(config.left_bracket, config.right_bracket)
+	)
 
 
 def get_annotation_id_before_position(doc: TextDocument, position: types.Position) -> Optional[int]:
@@ -138,38 +309,52 @@ def get_annotation_id_before_position(doc: TextDocument, position: types.Positio
 	return bisect_left(annotations, (pos_line, pos_char))
 
 
+def _annotation_index_at(ranges: AnnotationRanges, position: types.Position) -> int:
+	"""
+	返回包含给定位置的最内层批注区间在排序后列表中的下标，不在任何区间内时返回 -1。
+	"""
+	_, annotation_L, parents = ranges
+
+	pos = (position.line, position.character)
+
+	# 起点不晚于 pos 的最后一个区间；若它不包含 pos，沿外层区间向上查找，得到包含 pos 的最内层区间
+	index = bisect_right(annotation_L, pos + (sys.maxsize, sys.maxsize)) - 1
+	while index >= 0:
+		if pos <= annotation_L[index][2:]:
+			return index
+		index = parents[index]
+
+	return -1
+
+
 def get_annotation_at_position(doc: TextDocument, position: types.Position) -> Optional[int]:
 	"""
 	返回给定位置所在的批注区间的编号。
 
 	如果指定位置位于某个批注区间内，则返回该区间在排序后列表中的1-based编号；如果不在任何批注区间内，则返回None。
 	"""
-	annotation_R = find_annotation_ranges_raw(doc)
-	if annotation_R is None:
+	ranges = get_cached_ranges(doc)
+	if ranges is None:
 		return None
-	annotation_L = sorted(annotation_R)
+	index = _annotation_index_at(ranges, position)
+	return index + 1 if index >= 0 else None
 
-	for _, annotation in enumerate(annotation_L):
-		start_line, start_char, end_line, end_char = annotation
-		# info(f"Annotation_L {i}: L{start_line}C{start_char}-L{end_line}C{end_char}")
 
-	for _, annotation in enumerate(annotation_R):
-		start_line, start_char, end_line, end_char = annotation
-		# info(f"Annotation_R {i}: L{start_line}C{start_char}-L{end_line}C{end_char}")
-
-	pos_line = position.line
-	pos_char = position.character
-
-	for annotation in annotation_R:
-		start_line, start_char, end_line, end_char = annotation
-		if (
-			start_line <= pos_line <= end_line
-			and (start_line != pos_line or start_char <= pos_char)
-			and (end_line != pos_line or pos_char <= end_char)
-		):
-			return annotation_L.index(annotation) + 1
+def locate_annotation(
+	doc: TextDocument, position: types.Position
+) -> Optional[Tuple[int, types.Range]]:
+	"""
+	返回给定位置所在批注区间的1-based编号及其 Range。
 
-	return None
+	与 get_annotation_at_position 共用同一次扫描结果，且只为命中的区间构造 Range 对象。不在任何批注区间内时返回 None。
+	"""
+	ranges = get_cached_ranges(doc)
+	if ranges is None:
+		return None
+	index = _annotation_index_at(ranges, position)
+	if index < 0:
+		return None
+	return index + 1, tuple_to_range(ranges[1][index])
 
 
 def extract_notes_content(content: str) -> str:
@@ -182,28 +367,219 @@ def extract_notes_content(content: str) -> str:
 	Returns:
 	    “## Notes”所在行之后的所有内容字符串；若未找到该标题，则返回空字符串。
 	"""
-	# 按行分割并查找 ## Notes
-	lines = content.splitlines()
-	for i, line in enumerate(lines):
-		if line.strip() == "## Notes":
-			# 返回 ## Notes 后面的所有内容
-			return "\n".join(lines[i + 1 :]).strip()
+	if _NON_LF_BREAK_RE.search(content):
+		# 统一为 \n 分行，与按 splitlines 分行的结果一致，避免行尾残留 \r
+		content = "\n".join(content.splitlines())
+	match = _NOTES_HEADING_RE.search(content)
+	if match is None:
+		return ""
+	# 返回 ## Notes 后面的所有内容
+	return content[match.end() :].strip()
+
+
+def _parse_frontmatter_head(
+	head: bytes,
+) -> Optional[Tuple[Dict[str, str], Dict[str, Tuple[int, int]], int]]:
+	"""
+	按 `key: value` 逐行解析笔记开头的 frontmatter 块。
+
+	仅处理本工具自己写出的简单头部，返回 (元数据, 各字段值在 head 中的字节区间, 头部结束位置)；
+	遇到无法确定的结构（超出读取上限、引号、嵌套等）时返回 None。
+	"""
+	pos = head.find(b"\n") + 1
+	if pos == 0 or head[:pos].rstrip() != b"---":
+		return None
+
+	metadata = {}
+	spans = {}
+	while True:
+		line_end = head.find(b"\n", pos)
+		if line_end < 0:
+			# 在读取上限内没有找到结束的 ---
+			return None
+		line = head[pos:line_end]
+		if line.rstrip() == b"---":
+			return metadata, spans, line_end + 1
+
+		key, sep, rest = line.partition(b":")
+		value = rest.strip()
+		if not sep or not key or key[:1].isspace() or value.startswith(_YAML_INDICATOR_BYTES):
+			return None
+		name = key.strip().decode("utf-8", errors="replace")
+		value_start = pos + len(key) + 1 + len(rest) - len(rest.lstrip())
+		metadata[name] = value.decode("utf-8", errors="replace")
+		spans[name] = (value_start, value_start + len(value))
+		pos = line_end + 1
+
+
+def read_frontmatter_head(note_file: Path) -> Optional[Dict[str, Any]]:
+	"""
+	只读取笔记文件开头的 frontmatter 块，并按 YAML 规则解析为元数据字典。
+
+	头部不是本工具写出的简单结构，或其中某个值无法确定类型时返回 None，由调用方回退到
+	`frontmatter.load`；返回的元数据与 `frontmatter` 的解析结果一致。
+	"""
+	with open(note_file, "rb") as f:
+		head = f.read(_FRONTMATTER_HEAD_LIMIT)
+	parsed = _parse_frontmatter_head(head)
+	return None if parsed is None else _yaml_metadata(parsed[0])
+
+
+def _yaml_scalar(value: str) -> Tuple[bool, Any]:
+	"""
+	按 YAML 规则确定简单头部中一个值的类型，返回 (能否确定, 值)。
+
+	只识别十进制整数和明显的普通字符串；空值以及可能被解析为 null、浮点数、日期、布尔值等的值
+	返回 (False, None)。
+	"""
+	if not value:
+		return False, None
+	if _YAML_DECIMAL_RE.match(value):
+		return True, int(value)
+	first = value[0]
+	if not (first.isalpha() or first in "_/") or value.lower() in _YAML_SPECIAL_WORDS:
+		return False, None
+	if _YAML_UNSAFE_RE.search(value):
+		return False, None
+	return True, value
+
+
+def _yaml_metadata(raw: Dict[str, str]) -> Optional[Dict[str, Any]]:
+	"""
+	用 _yaml_scalar 逐个确定简单头部中各值的类型；任一值无法确定时返回 None。
+	"""
+	metadata = {}
+	for key, value in raw.items():
+		ok, metadata[key] = _yaml_scalar(value)
+		if not ok:
+			return None
+	return metadata
 
-	return ""
+
+def parse_note(data: bytes) -> Optional[Tuple[Dict[str, Any], str]]:
+	"""
+	解析本工具写出的笔记文件内容，返回 (元数据, 正文)，结果与 `frontmatter.loads` 一致。
+
+	只处理 `key: value` 形式的简单头部，不经过 YAML 解析；遇到无法确定的结构或值时返回 None，
+	由调用方回退到 `frontmatter`。
+	"""
+	parsed = _parse_frontmatter_head(data)
+	if parsed is None:
+		return None
+	raw, _, header_end = parsed
+	metadata = _yaml_metadata(raw)
+	if metadata is None:
+		return None
+	try:
+		content = data[header_end:].decode("utf-8")
+	except UnicodeDecodeError:
+		return None
+	return metadata, content.strip()
+
+
+def _update_frontmatter_in_place(note_path: str, fields: Dict[str, Any]) -> bool:
+	"""
+	直接改写笔记头部中各字段值所在的字节区间，不解析、不重新序列化整篇笔记。
+
+	新旧头部等长时只覆盖头部；否则从头部起重写文件。头部结构不简单、字段不存在或新值需要 YAML 转义时返回 False。
+	"""
+	new_values = {}
+	for key, value in fields.items():
+		if isinstance(value, bool) or not isinstance(value, (int, str)):
+			return False
+		text = str(value)
+		# 写回的值必须能被 YAML 原样读回，否则交给 frontmatter 按需加引号
+		if (
+			text != text.strip()
+			or "\n" in text
+			or "\r" in text
+			or _yaml_scalar(text) != (True, value)
+		):
+			return False
+		new_values[key] = text.encode("utf-8")
+
+	with open(note_path, "r+b") as f:
+		head = f.read(_FRONTMATTER_HEAD_LIMIT)
+		parsed = _parse_frontmatter_head(head)
+		if parsed is None:
+			return False
+		_, spans, header_end = parsed
+		if any(key not in spans for key in new_values):
+			return False
+
+		pieces = []
+		last = 0
+		for key in sorted(new_values, key=lambda k: spans[k][0]):
+			start, end = spans[key]
+			pieces.append(head[last:start])
+			pieces.append(new_values[key])
+			last = end
+		pieces.append(head[last:header_end])
+		new_header = b"".join(pieces)
+
+		if new_header == head[:header_end]:
+			return True
+		if len(new_header) == header_end:
+			f.seek(0)
+			f.write(new_header)
+		else:
+			# 文件指针已位于 head 之后，剩余内容直接接在 head 中头部之后的部分后面
+			tail = head[header_end:] + f.read()
+			f.seek(0)
+			f.write(new_header + tail)
+			f.truncate()
+	return True
+
+
+def _cache_note_post(note_path: str, post: "frontmatter.Post") -> None:
+	stat = os.stat(note_path)
+	_note_post_cache[note_path] = (stat.st_mtime_ns, stat.st_size, post)
+	_note_post_cache.move_to_end(note_path)
+	if len(_note_post_cache) > _NOTE_POST_CACHE_SIZE:
+		_note_post_cache.popitem(last=False)
+
+
+def update_note_metadata(note_file: Path, **fields: Any):
+	"""
+	一次性更新批注笔记文件 frontmatter 中的多个元数据字段，只读写文件一次。
+
+	简单头部直接改写对应字段值的字节区间；否则回退到 frontmatter 解析，解析结果按文件的 mtime 和大小缓存，
+	连续更新同一文件时无需重新解析。字段值均未变化时不写回文件。若文件不存在则不执行任何操作。
+	"""
+	note_path = str(note_file)
+	try:
+		if _update_frontmatter_in_place(note_path, fields):
+			return
+		stat = os.stat(note_path)
+	except FileNotFoundError:
+		return
+
+	import frontmatter
+
+	cached = _note_post_cache.get(note_path)
+	if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+		post = cached[2]
+	else:
+		post = frontmatter.load(note_path)
+
+	if any(post.metadata.get(key) != value for key, value in fields.items()):
+		post.metadata.update(fields)
+		try:
+			frontmatter.dump(post, note_path)
+		except Exception:
+			# 写入失败时内存中的 Post 已与磁盘不一致
+			_note_post_cache.pop(note_path, None)
+			raise
+	_cache_note_post(note_path, post)
 
 
 def update_note_source(note_file: Path, file_path: str):
 	"""
 	更新批注笔记文件的元数据中的源文件路径字段。
 
-	如果指定的笔记文件存在，则加载其 frontmatter 元数据，将 "file" 字段更新为给定的文件路径，并保存更改。若文件不存在则不执行任何操作。
+	如果指定的笔记文件存在，则将其 frontmatter 中的 "file" 字段更新为给定的文件路径。若文件不存在则不执行任何操作。
 	"""
-	if not note_file.exists():
-		return
-	note_path = str(note_file)
-	post = frontmatter.load(note_path)
-	post.metadata["file"] = file_path
-	frontmatter.dump(post, note_path)
+	update_note_metadata(note_file, file=file_path)
 
 
 def update_note_aid(note_file: Path, annotation_id: int):
@@ -212,9 +588,4 @@ def update_note_aid(note_file: Path, annotation_id: int):
 
 	如果文件不存在，则不进行任何操作。
 	"""
-	if not note_file.exists():
-		return
-	note_path = str(note_file)
-	post = frontmatter.load(note_path)
-	post.metadata["id"] = annotation_id
-	frontmatter.dump(post, note_path)
+	update_note_metadata(note_file, id=annotation_id)
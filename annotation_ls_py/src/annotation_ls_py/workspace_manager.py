@@ -1,10 +1,48 @@
+import functools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
-from urllib.parse import urlparse, unquote
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
+from .config import get_config
 from .db_manager import DatabaseManager
 from .note_manager import NoteManager
 from .logger import error, info
+from .utils import uri_to_path
+
+# 根目录下的子目录数达到该值时，用线程池并行遍历各子目录（目录读取会释放 GIL）
+_PARALLEL_WALK_MIN_DIRS = 8
+_PARALLEL_WALK_WORKERS = 8
+
+
+def _path_key(path: Path) -> List[str]:
+	"""
+	返回路径在前缀树中的键：各路径分量经 normcase 处理，与 Workspace 中根路径字符串的比较方式一致。
+	"""
+	return [os.path.normcase(part) for part in path.parts]
+
+
+@functools.lru_cache(maxsize=1024)
+def _path_to_uri(path_str: str) -> str:
+	"""将路径字符串编码为 file URI，结果按路径缓存（as_uri 需要逐字符做 URL 编码）。"""
+	return Path(path_str).as_uri()
+
+
+# 文件 URI -> 工作区 查询缓存的最大条目数
+_FILE_WORKSPACE_CACHE_SIZE = 1024
+
+# 目录扫描缓存的最大条目数
+_SCAN_CACHE_SIZE = 4096
+
+# 项目树结构版本号，任何父子关系变化时递增，用于使各工作区缓存的子树/祖先列表失效
+_tree_version = 0
+
+
+def _bump_tree_version() -> None:
+	global _tree_version
+	_tree_version += 1
 
 
 class Workspace:
@@ -18,9 +56,18 @@ class Workspace:
 			root_path: 工作区的根目录路径。
 		"""
 		self.root_path = root_path
-		self.uri = root_path.as_uri()
+		self.uri = _path_to_uri(os.fspath(root_path))
+		# 用于路径包含判断的规范化根路径字符串及带尾部分隔符的前缀
+		self._root_str = os.path.normcase(os.fspath(root_path))
+		self._root_prefix = os.path.join(self._root_str, "")
+		# 根路径的分量数，文件相对该工作区的深度可直接由分量数之差得出
+		self._depth = len(root_path.parts)
 		self.parent: Optional[Workspace] = None
 		self.children: List[Workspace] = []
+		# (树版本号, 结果)，见 get_subtree_workspaces / get_ancestor_workspaces
+		self._subtree_cache: Optional[Tuple[int, Tuple["Workspace", ...]]] = None
+		self._ancestors_cache: Optional[Tuple[int, Tuple["Workspace", ...]]] = None
+		self._root_cache: Optional[Tuple[int, "Workspace"]] = None
 
 		# 初始化管理器
 		self.db_manager = DatabaseManager(root_path)
@@ -36,6 +83,7 @@ class Workspace:
 			child.parent.children.remove(child)
 		child.parent = self
 		self.children.append(child)
+		_bump_tree_version()
 
 	def remove_child(self, child: "Workspace") -> None:
 		"""
@@ -46,6 +94,7 @@ class Workspace:
 		if child in self.children:
 			child.parent = None
 			self.children.remove(child)
+			_bump_tree_version()
 
 	def contains_file(self, file_uri: str) -> bool:
 		"""
@@ -57,12 +106,16 @@ class Workspace:
 		Returns:
 			如果文件属于该工作区，则返回True；否则返回False。
 		"""
-		file_path = Path(unquote(urlparse(file_uri).path))
-		try:
-			file_path.relative_to(self.root_path)
-			return True
-		except ValueError:
-			return False
+		return self.contains_path(uri_to_path(file_uri))
+
+	def contains_path(self, file_path: Path) -> bool:
+		"""
+		判断指定路径是否位于当前工作区的根目录或其子目录下。
+		"""
+		return self._contains_path_str(os.path.normcase(os.fspath(file_path)))
+
+	def _contains_path_str(self, path_str: str) -> bool:
+		return path_str == self._root_str or path_str.startswith(self._root_prefix)
 
 	def get_workspace_for_file(self, file_uri: str) -> Optional["Workspace"]:
 		"""
@@ -76,48 +129,51 @@ class Workspace:
 		Returns:
 			包含该文件的最深层 Workspace 实例，若未找到则为 None。
 		"""
-		if not self.contains_file(file_uri):
+		file_path = uri_to_path(file_uri)
+		return self._get_workspace_for_path(
+			os.path.normcase(os.fspath(file_path)), len(file_path.parts)
+		)
+
+	def _get_workspace_for_path(self, path_str: str, file_depth: int) -> Optional["Workspace"]:
+		"""
+		get_workspace_for_file 的递归实现；路径字符串和分量数只在入口处计算一次。
+		"""
+		if not self._contains_path_str(path_str):
 			return None
 
-		# 在子工作区中查找
+		# 在子工作区中查找；返回的工作区必然包含该文件，深度可直接由路径分量数得出
 		deepest_workspace = None
 		min_depth = 2147483647  # 初始设为最大值
 
 		for child in self.children:
-			workspace = child.get_workspace_for_file(file_uri)
+			workspace = child._get_workspace_for_path(path_str, file_depth)
 			if workspace:
-				try:
-					relative = Path(unquote(urlparse(file_uri).path)).relative_to(
-						workspace.root_path
-					)
-					depth = len(relative.parts)
-					if depth < min_depth:
-						deepest_workspace = workspace
-						min_depth = depth
-				except ValueError:
-					continue
-
-		# 如果没有找到更深的工作区，返回当前工作区
-		if not deepest_workspace:
-			try:
-				relative = Path(unquote(urlparse(file_uri).path)).relative_to(self.root_path)
-				depth = len(relative.parts)
+				depth = file_depth - workspace._depth
 				if depth < min_depth:
-					deepest_workspace = self
-			except ValueError:
-				pass
+					deepest_workspace = workspace
+					min_depth = depth
 
-		return deepest_workspace
+		# 如果没有找到更深的工作区，返回当前工作区
+		return deepest_workspace or self
 
 	def get_subtree_workspaces(self: "Workspace") -> List["Workspace"]:
 		"""
 		返回当前工作区及其所有子工作区的列表。
 
-		该方法递归遍历当前工作区的所有子节点，收集整个子树中的所有工作区实例。
+		按先序遍历顺序返回整个子树中的所有工作区实例；结果在项目树结构不变时复用。
 		"""
-		result = [self]
-		for child in self.children:
-			result.extend(child.get_subtree_workspaces())
+		cached = self._subtree_cache
+		if cached is not None and cached[0] == _tree_version:
+			return list(cached[1])
+
+		result = []
+		stack = [self]
+		while stack:
+			workspace = stack.pop()
+			result.append(workspace)
+			stack.extend(reversed(workspace.children))
+
+		self._subtree_cache = (_tree_version, tuple(result))
 		return result
 
 	def get_ancestor_workspaces(self: "Workspace") -> List["Workspace"]:
@@ -127,11 +183,34 @@ class Workspace:
 		返回：
 		    包含当前工作区及其所有祖先的列表，顺序为从当前节点到根节点。
 		"""
-		result = [self]
-		if self.parent:
-			result.extend(self.parent.get_ancestor_workspaces())
+		cached = self._ancestors_cache
+		if cached is not None and cached[0] == _tree_version:
+			return list(cached[1])
+
+		result = []
+		workspace = self
+		while workspace is not None:
+			result.append(workspace)
+			workspace = workspace.parent
+
+		self._ancestors_cache = (_tree_version, tuple(result))
 		return result
 
+	def get_root_workspace(self: "Workspace") -> "Workspace":
+		"""
+		返回当前工作区所在项目树的根工作区；结果在项目树结构不变时复用。
+		"""
+		cached = self._root_cache
+		if cached is not None and cached[0] == _tree_version:
+			return cached[1]
+
+		root = self
+		while root.parent is not None:
+			root = root.parent
+
+		self._root_cache = (_tree_version, root)
+		return root
+
 
 class WorkspaceManager:
 	"""管理多个项目树的森林"""
@@ -142,75 +221,201 @@ class WorkspaceManager:
 		"""
 		self._roots: List[Workspace] = []  # 所有根项目
 		self._all_workspaces: Dict[str, Workspace] = {}  # uri -> workspace
+		# 按路径分量组织的前缀树，节点为 {"children": {分量: 节点}, "workspace": Workspace 或 None}
+		self._trie: Dict[str, Any] = self._new_trie_node()
+		# 文件 URI -> 最深层工作区（含未命中的 None），前缀树变化时整体清空
+		self._file_ws_cache: "OrderedDict[str, Optional[Workspace]]" = OrderedDict()
+		# 目录路径 -> (目录 mtime_ns, 是否包含 .annotation, 子目录路径列表)，按 LRU 淘汰
+		self._subprojects_cache: "OrderedDict[str, Tuple[int, bool, List[str]]]" = OrderedDict()
+		# 并行遍历子目录时保护目录扫描缓存
+		self._scan_cache_lock = threading.Lock()
+
+	@staticmethod
+	def _new_trie_node() -> Dict[str, Any]:
+		return {"children": {}, "workspace": None}
+
+	def _trie_insert(self, workspace: Workspace) -> None:
+		"""
+		将工作区登记到前缀树中其根路径对应的节点上。
+		"""
+		node = self._trie
+		for part in _path_key(workspace.root_path):
+			node = node["children"].setdefault(part, self._new_trie_node())
+		node["workspace"] = workspace
+		self._file_ws_cache.clear()
+
+	def _trie_remove(self, workspace: Workspace) -> None:
+		"""
+		从前缀树中移除工作区，并清理不再包含任何工作区的空节点。
+		"""
+		path = [(None, self._trie)]
+		node = self._trie
+		for part in _path_key(workspace.root_path):
+			node = node["children"].get(part)
+			if node is None:
+				return
+			path.append((part, node))
+		if node["workspace"] is not workspace:
+			return
+		node["workspace"] = None
+		self._file_ws_cache.clear()
+
+		# 自底向上删除空节点
+		for i in range(len(path) - 1, 0, -1):
+			part, node = path[i]
+			if node["workspace"] is not None or node["children"]:
+				break
+			del path[i - 1][1]["children"][part]
+
+	def _lookup_deepest(self, path: Path) -> Optional[Workspace]:
+		"""
+		沿前缀树查找根路径为 path 祖先（含自身）的最深层工作区。
+		"""
+		node = self._trie
+		deepest = None
+		for part in _path_key(path):
+			node = node["children"].get(part)
+			if node is None:
+				break
+			if node["workspace"] is not None:
+				deepest = node["workspace"]
+		return deepest
 
 	def _find_root_project_for_path(self, path: Path) -> Optional[Workspace]:
 		"""
-		查找给定路径所属的最深层根工作区。
+		查找给定路径所属的根工作区。
 
-		遍历所有根工作区，返回其根目录为给定路径最近祖先的工作区实例。如果路径不属于任何根工作区，则返回 None。
+		先在前缀树中找到包含该路径的最深层工作区，再沿父节点上溯到项目树的根。如果路径不属于任何根工作区，则返回 None。
 		"""
 		try:
-			min_depth = 2147483647
-			root = None
-
-			# 遍历所有根项目，找到相对路径最短的那个
-			for workspace in self._roots:
-				try:
-					relative = path.relative_to(workspace.root_path)
-					depth = len(relative.parts)
-					if depth < min_depth:
-						root = workspace
-						min_depth = depth
-				except ValueError:
-					continue
-
-			return root
+			workspace = self._lookup_deepest(path)
+			return workspace.get_root_workspace() if workspace is not None else None
 		except Exception as e:
 			error(f"Failed to find root for path {path}: {str(e)}")
 			return None
 
+	def _scan_dir(self, dir_path: str) -> Tuple[Tuple[int, int], bool, List[str]]:
+		"""
+		列出目录中需要继续搜索的子目录，并判断该目录是否包含 .annotation 目录。
+
+		返回目录的 (st_dev, st_ino)、是否包含 .annotation 以及子目录路径列表；指向目录的符号链接按目录处理。
+		结果按目录的 mtime 缓存；目录内容（增删子目录）发生变化时 mtime 随之改变，缓存自动失效。
+		"""
+		st = os.stat(dir_path)
+		key = (st.st_dev, st.st_ino)
+		mtime = st.st_mtime_ns
+		with self._scan_cache_lock:
+			cached = self._subprojects_cache.get(dir_path)
+			if cached is not None and cached[0] == mtime:
+				self._subprojects_cache.move_to_end(dir_path)
+				return key, cached[1], cached[2]
+
+		ignored_dirs = get_config().ignored_dirs
+		has_annotation = False
+		children = []
+		with os.scandir(dir_path) as entries:
+			for entry in entries:
+				if not entry.is_dir():
+					continue
+				if entry.name == ".annotation":
+					has_annotation = True
+				elif not entry.name.startswith(".") and entry.name not in ignored_dirs:
+					children.append(entry.path)
+
+		with self._scan_cache_lock:
+			self._subprojects_cache[dir_path] = (mtime, has_annotation, children)
+			self._subprojects_cache.move_to_end(dir_path)
+			if len(self._subprojects_cache) > _SCAN_CACHE_SIZE:
+				self._subprojects_cache.popitem(last=False)
+		return key, has_annotation, children
+
+	def _scan_dir_safe(
+		self, dir_path: str, errors: List[str]
+	) -> Optional[Tuple[Tuple[int, int], bool, List[str]]]:
+		"""
+		调用 _scan_dir，失败时把错误信息追加到 errors 并返回 None。
+
+		可能在工作线程中执行，因此不直接写日志，由调用方在主线程统一输出。
+		"""
+		try:
+			return self._scan_dir(dir_path)
+		except FileNotFoundError:
+			errors.append(f"Path does not exist: {dir_path}")
+		except PermissionError:
+			errors.append(f"Permission denied when accessing directory: {dir_path}")
+		except UnicodeDecodeError:
+			errors.append(f"Unicode decode error when accessing directory: {dir_path}")
+		except Exception as e:
+			errors.append(f"Failed to find subprojects in {dir_path}: {str(e)}")
+		return None
+
+	def _walk_subprojects(
+		self, start_dir: str, ancestors: FrozenSet[Tuple[int, int]], errors: List[str]
+	) -> List[Path]:
+		"""
+		以 start_dir 为起点先序遍历，返回其中包含 .annotation 目录的路径列表。
+
+		用显式栈遍历，过程中只处理路径字符串，仅为结果构造 Path。ancestors 为起点各祖先目录的
+		(st_dev, st_ino)；符号链接指回当前路径上的祖先目录（成环）时不再深入，其余经由符号链接
+		到达的目录照常按链接路径记录，同一目录的各个别名路径都会被找到。
+		"""
+		result = []
+		stack = [(start_dir, ancestors)]
+		while stack:
+			dir_path, dir_ancestors = stack.pop()
+			scanned = self._scan_dir_safe(dir_path, errors)
+			if scanned is None:
+				continue
+			key, has_annotation, children = scanned
+			if key in dir_ancestors:
+				continue
+			# 如果当前目录包含 .annotation，加入结果
+			if has_annotation:
+				result.append(Path(dir_path))
+			child_ancestors = dir_ancestors | {key}
+			stack.extend((child, child_ancestors) for child in reversed(children))
+		return result
+
 	def _find_subprojects(self, root_path: Path) -> List[Path]:
 		"""
-		递归查找指定根目录下所有包含 .annotation 目录的子目录。
+		查找指定根目录下所有包含 .annotation 目录的子目录。
 
-		遍历 root_path 及其所有子目录，返回其中包含 .annotation 目录的所有路径列表。遇到权限或解码错误时会跳过相应目录并记录错误日志。
+		遍历 root_path 及其所有子目录（跳过隐藏目录与配置中的 ignored_dirs，跟随目录符号链接但不沿成环的链接深入），返回其中包含 .annotation 目录的所有路径列表。
+		根目录下子目录较多时，各子目录在线程池中并行遍历，结果顺序与顺序遍历一致。遇到权限或解码错误时会跳过相应目录并记录错误日志。
 
 		Args:
 		    root_path: 要递归搜索的根目录路径。
 
 		Returns:
-		    所有包含 .annotation 目录的子目录路径列表。
+		    所有包含 .annotation 目录的子目录路径列表，按先序遍历顺序排列，父目录总在其子目录之前。
 		"""
 		result = []
-		try:
-			# 确保路径是有效的 Path 对象
-			if not isinstance(root_path, Path):
-				root_path = Path(str(root_path))
-
-			# 检查路径是否存在
-			if not root_path.exists():
-				error(f"Path does not exist: {root_path}")
-				return result
+		errors: List[str] = []
+		root = os.fspath(root_path)
+
+		# 路径是否存在由 _scan_dir 中的 stat 顺带检查，不再单独探测
+		scanned = self._scan_dir_safe(root, errors)
+		if scanned is not None:
+			key, has_annotation, children = scanned
+			ancestors = frozenset({key})
+			if has_annotation:
+				result.append(Path(root))
+
+			if len(children) < _PARALLEL_WALK_MIN_DIRS:
+				for child in children:
+					result.extend(self._walk_subprojects(child, ancestors, errors))
+			else:
+				workers = min(_PARALLEL_WALK_WORKERS, len(children))
+				with ThreadPoolExecutor(max_workers=workers) as executor:
+					walks = executor.map(
+						lambda child: self._walk_subprojects(child, ancestors, errors), children
+					)
+					for found in walks:
+						result.extend(found)
 
-			# 如果当前目录包含 .annotation，加入结果
-			annotation_dir = root_path / ".annotation"
-			if annotation_dir.exists() and annotation_dir.is_dir():
-				result.append(root_path)
-
-			# 递归搜索子目录
-			try:
-				for item in root_path.iterdir():
-					if item.is_dir() and not item.name.startswith("."):
-						result.extend(self._find_subprojects(item))
-			except PermissionError:
-				error(f"Permission denied when accessing directory: {root_path}")
-			except UnicodeDecodeError:
-				error(f"Unicode decode error when accessing directory: {root_path}")
-
-			return result
-		except Exception as e:
-			error(f"Failed to find subprojects in {root_path}: {str(e)}")
-			return result
+		for message in errors:
+			error(message)
+		return result
 
 	def add_workspace(self, workspace_uri: str) -> Optional[Workspace]:
 		"""
@@ -231,7 +436,8 @@ class WorkspaceManager:
 
 			# 创建新工作区
 			# 解码 URL 编码的路径
-			workspace_path = Path(unquote(urlparse(workspace_uri).path))
+			workspace_path = uri_to_path(workspace_uri)
+			workspace_path_uri = _path_to_uri(os.fspath(workspace_path))
 
 			# 确保路径存在
 			if not workspace_path.exists():
@@ -245,8 +451,7 @@ class WorkspaceManager:
 				info(f"No projects with .annotation directory found in {workspace_path}")
 				return None
 
-			# 按路径长度排序，确保父项目在子项目之前处理
-			project_paths.sort(key=lambda p: len(str(p)))
+			# _find_subprojects 按先序遍历返回，父项目已经排在子项目之前，无需再排序
 
 			# 找到这些路径所属的根项目
 			root = self._find_root_project_for_path(workspace_path)
@@ -255,27 +460,15 @@ class WorkspaceManager:
 
 				# 将新发现的项目添加到现有树中
 				for path in project_paths:
-					path_uri = path.as_uri()
+					path_uri = _path_to_uri(os.fspath(path))
 					if path_uri not in self._all_workspaces:
 						info(f"Adding workspace {path} to existing tree")
 						# 创建工作区
 						workspace = Workspace(path)
 						self._all_workspaces[path_uri] = workspace
+						self._trie_insert(workspace)
 						# 插入到项目树中
 						self._insert_workspace(workspace)
-
-				# 确保原始 URI 也有映射
-				if (
-					workspace_uri not in self._all_workspaces
-					and workspace_path.as_uri() in self._all_workspaces
-				):
-					self._all_workspaces[workspace_uri] = self._all_workspaces[
-						workspace_path.as_uri()
-					]
-
-				return self._all_workspaces.get(workspace_uri) or self._all_workspaces.get(
-					workspace_path.as_uri()
-				)
 			else:
 				# 没找到根项目，创建新的项目树
 				info(f"Creating new project tree for {workspace_path}")
@@ -284,26 +477,19 @@ class WorkspaceManager:
 				for path in project_paths:
 					info(f"Adding workspace {path} to new tree")
 					workspace = Workspace(path)
-					path_uri = path.as_uri()
-					self._all_workspaces[path_uri] = workspace
+					self._all_workspaces[workspace.uri] = workspace
+					self._trie_insert(workspace)
 					# 第一个路径作为根项目
 					if path == project_paths[0]:
 						self._roots.append(workspace)
 					else:
 						self._insert_workspace(workspace)
 
-				# 确保原始 URI 也有映射
-				if (
-					workspace_uri not in self._all_workspaces
-					and workspace_path.as_uri() in self._all_workspaces
-				):
-					self._all_workspaces[workspace_uri] = self._all_workspaces[
-						workspace_path.as_uri()
-					]
-
-				return self._all_workspaces.get(workspace_uri) or self._all_workspaces.get(
-					workspace_path.as_uri()
-				)
+			# 确保原始 URI 也有映射（函数开头已排除 workspace_uri 已存在的情况）
+			workspace = self._all_workspaces.get(workspace_path_uri)
+			if workspace is not None and workspace_uri != workspace_path_uri:
+				self._all_workspaces[workspace_uri] = workspace
+			return workspace
 
 		except Exception as e:
 			error(f"Failed to add workspace {workspace_uri}: {str(e)}")
@@ -332,19 +518,36 @@ class WorkspaceManager:
 				self._roots.remove(workspace)
 				for child in workspace.get_subtree_workspaces():
 					self._all_workspaces.pop(child.uri, None)
+					self._trie_remove(child)
+				self._forget_scanned_dirs(workspace.root_path)
 				return True
 
 			# 否则只移除这个工作区 TODO: 改成移除子树
 			info(f"Removing workspace {workspace_uri}")
+			# 子工作区随该节点一起脱离项目树，不应再被查找到
+			for child in workspace.get_subtree_workspaces():
+				self._trie_remove(child)
 			if workspace.parent:
 				workspace.parent.remove_child(workspace)
 			self._all_workspaces.pop(workspace_uri, None)
+			self._forget_scanned_dirs(workspace.root_path)
 			return True
 
 		except Exception as e:
 			error(f"Failed to remove workspace {workspace_uri}: {str(e)}")
 			return False
 
+	def _forget_scanned_dirs(self, root_path: Path) -> None:
+		"""
+		丢弃 root_path 及其子目录的目录扫描缓存。
+		"""
+		root = str(root_path)
+		prefix = os.path.join(root, "")
+		with self._scan_cache_lock:
+			stale = [p for p in self._subprojects_cache if p == root or p.startswith(prefix)]
+			for dir_path in stale:
+				del self._subprojects_cache[dir_path]
+
 	def _insert_workspace(self, workspace: Workspace) -> None:
 		"""
 		将指定工作区插入到项目树的正确层级位置。
@@ -352,25 +555,17 @@ class WorkspaceManager:
 		根据工作区的根路径，自动查找最深的父工作区并建立父子关系；若无父工作区，则将其作为根工作区添加。
 		"""
 		try:
-			# 找到所有可能的父工作区（路径比这个工作区短的）
-			potential_parents = []
-			for other in self._all_workspaces.values():
-				if other == workspace:
-					continue
-				try:
-					relative = workspace.root_path.relative_to(other.root_path)
-					potential_parents.append((other, len(relative.parts)))
-				except ValueError:
-					continue
+			# 沿前缀树查找根路径为该工作区祖先目录的最深层工作区
+			parent = None
+			if workspace._depth > 1:
+				parent = self._lookup_deepest(workspace.root_path.parent)
 
-			if not potential_parents:
+			if parent is None:
 				# 没有找到父工作区，说明应该是根项目
 				if workspace not in self._roots:
 					self._roots.append(workspace)
 				return
 
-			# 选择路径最长的作为父工作区（最深的那个）
-			parent, _ = max(potential_parents, key=lambda x: x[1])
 			parent.add_child(workspace)
 
 		except Exception as e:
@@ -380,7 +575,8 @@ class WorkspaceManager:
 		"""
 		返回包含指定文件 URI 的最深层工作区。
 
-		如果文件属于某个根项目，则在该项目树中查找包含该文件的最具体（路径最深）的工作区；若未找到，则返回 None。
+		沿路径分量在前缀树中逐级查找，返回包含该文件的最具体（路径最深）的工作区；若未找到，则返回 None。
+		查询结果按 URI 缓存，工作区增删时失效。
 
 		参数:
 			file_uri: 文件的 URI。
@@ -389,28 +585,15 @@ class WorkspaceManager:
 			包含该文件的最深层 Workspace 实例，若未找到则返回 None。
 		"""
 		try:
-			file_path = Path(unquote(urlparse(file_uri).path))
-
-			# 先找到所属的根项目
-			root = self._find_root_project_for_path(file_path)
-			if not root:
-				return None
-
-			# 在这个项目树中找最深的工作区
-			deepest_workspace = None
-			min_depth = 2147483647
-
-			for workspace in root.get_subtree_workspaces():
-				try:
-					relative = file_path.relative_to(workspace.root_path)
-					depth = len(relative.parts)
-					if depth < min_depth:
-						deepest_workspace = workspace
-						min_depth = depth
-				except ValueError:
-					continue
-
-			return deepest_workspace
+			if file_uri in self._file_ws_cache:
+				self._file_ws_cache.move_to_end(file_uri)
+				return self._file_ws_cache[file_uri]
+
+			workspace = self._lookup_deepest(uri_to_path(file_uri))
+			self._file_ws_cache[file_uri] = workspace
+			if len(self._file_ws_cache) > _FILE_WORKSPACE_CACHE_SIZE:
+				self._file_ws_cache.popitem(last=False)
+			return workspace
 
 		except Exception as e:
 			error(f"Failed to get workspace for {file_uri}: {str(e)}")
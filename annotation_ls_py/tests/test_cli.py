@@ -0,0 +1,21 @@
+import sys
+
+import pytest
+
+from annotation_ls_py.cli import _HELP, _build_parser, main
+
+
+@pytest.mark.skipif(
+	sys.version_info < (3, 10), reason="argparse 在 3.10 之前使用 optional arguments 标题"
+)
+def test_static_help_matches_parser(monkeypatch):
+	# argparse 按终端宽度换行；_HELP 对应 usage 行不换行的宽终端输出
+	monkeypatch.setenv("COLUMNS", "200")
+	parser = _build_parser(prog="annotation-ls")
+	assert _HELP.format(prog="annotation-ls") == parser.format_help()
+
+
+def test_help_is_answered_without_parser(monkeypatch, capsys):
+	monkeypatch.setattr(sys, "argv", ["annotation-ls"])
+	assert main(["--help"]) == 0
+	assert capsys.readouterr().out == _HELP.format(prog="annotation-ls")
@@ -0,0 +1,210 @@
+import sqlite3
+
+import pytest
+
+from annotation_ls_py.db_manager import DatabaseManager
+
+SOURCE = "src.txt"
+
+
+@pytest.fixture
+def db(tmp_path):
+	manager = DatabaseManager(tmp_path)
+	yield manager
+	manager.close()
+
+
+def _uri(db):
+	return (db.project_root / SOURCE).as_uri()
+
+
+def _write_note(db, note_file, annotation_id):
+	notes_dir = db.project_root / ".annotation" / "notes"
+	notes_dir.mkdir(parents=True, exist_ok=True)
+	(notes_dir / note_file).write_text(
+		f"---\nfile: {SOURCE}\nid: {annotation_id}\n---\n\n## Notes\n", encoding="utf-8"
+	)
+
+
+def _note_id(db, note_file):
+	text = (db.project_root / ".annotation" / "notes" / note_file).read_text(encoding="utf-8")
+	return int(text.split("id: ", 1)[1].split("\n", 1)[0])
+
+
+def _create(db, count):
+	"""创建 ID 为 1..count 的标注及其笔记文件，返回按 ID 排列的笔记文件名。"""
+	conn = db._get_conn()
+	with db.transaction():
+		conn.execute("INSERT INTO files (path) VALUES (?)", (SOURCE,))
+		for annotation_id in range(1, count + 1):
+			conn.execute(
+				"INSERT INTO annotations (file_id, annotation_id, note_file) VALUES (1, ?, ?)",
+				(annotation_id, f"n{annotation_id}.md"),
+			)
+	for annotation_id in range(1, count + 1):
+		_write_note(db, f"n{annotation_id}.md", annotation_id)
+	return [f"n{annotation_id}.md" for annotation_id in range(1, count + 1)]
+
+
+def _ids(db):
+	rows = db._get_conn().execute("SELECT annotation_id FROM annotations ORDER BY annotation_id")
+	return [row[0] for row in rows]
+
+
+def _abort_updates(db):
+	db._get_conn().execute(
+		"CREATE TRIGGER abort_shift BEFORE UPDATE ON annotations "
+		"BEGIN SELECT RAISE(ABORT, 'shift failed'); END"
+	)
+
+
+def test_delete_then_shift_is_atomic(db):
+	_create(db, 3)
+
+	with db.transaction():
+		assert db.delete_annotation(_uri(db), 1)
+		assert db.increase_annotation_ids(_uri(db), 1, -1)
+
+	assert _ids(db) == [1, 2]
+	assert [_note_id(db, name) for name in ("n2.md", "n3.md")] == [1, 2]
+
+
+def test_failed_shift_rolls_back_delete(db):
+	_create(db, 3)
+	_abort_updates(db)
+
+	with pytest.raises(sqlite3.IntegrityError):
+		with db.transaction():
+			db.delete_annotation(_uri(db), 1)
+			db.increase_annotation_ids(_uri(db), 1, -1)
+
+	assert _ids(db) == [1, 2, 3]
+	assert not db._get_conn().in_transaction
+
+
+def test_failed_shift_rolls_back_create(db):
+	_create(db, 2)
+	_abort_updates(db)
+
+	with pytest.raises(sqlite3.IntegrityError):
+		with db.transaction():
+			db.increase_annotation_ids(_uri(db), 1)
+			db.create_annotation(_uri(db), 1)
+
+	assert _ids(db) == [1, 2]
+
+
+def test_failed_shift_outside_transaction_returns_false(db):
+	_create(db, 2)
+	_abort_updates(db)
+
+	assert db.increase_annotation_ids(_uri(db), 1) is False
+	assert _ids(db) == [1, 2]
+
+
+def test_notes_are_rewritten_only_after_commit(db):
+	_create(db, 3)
+
+	with pytest.raises(RuntimeError):
+		with db.transaction():
+			assert db.increase_annotation_ids(_uri(db), 2)
+			raise RuntimeError("abort")
+
+	assert _ids(db) == [1, 2, 3]
+	assert [_note_id(db, name) for name in ("n1.md", "n2.md", "n3.md")] == [1, 2, 3]
+
+	assert db.increase_annotation_ids(_uri(db), 2)
+	assert [_note_id(db, name) for name in ("n1.md", "n2.md", "n3.md")] == [1, 3, 4]
+
+
+def test_failed_commit_does_not_leave_transaction_open(db):
+	conn = db._get_conn()
+	conn.execute("PRAGMA foreign_keys=ON")
+	conn.execute("PRAGMA defer_foreign_keys=ON")
+
+	# 延迟外键检查在 COMMIT 时才失败
+	with pytest.raises(sqlite3.IntegrityError):
+		with db.transaction() as txn:
+			txn.execute(
+				"INSERT INTO annotations (file_id, annotation_id, note_file) VALUES (42, 1, 'x.md')"
+			)
+
+	assert not conn.in_transaction
+	assert _ids(db) == []
+
+
+def test_migration_upgrades_existing_database(tmp_path):
+	db_dir = tmp_path / ".annotation" / "db"
+	db_dir.mkdir(parents=True)
+	conn = sqlite3.connect(str(db_dir / "annotations.db"))
+	conn.executescript(
+		"""
+		CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, last_modified TIMESTAMP);
+		CREATE TABLE annotations (
+			id INTEGER PRIMARY KEY,
+			file_id INTEGER,
+			annotation_id INTEGER,
+			note_file TEXT,
+			FOREIGN KEY (file_id) REFERENCES files (id),
+			UNIQUE (file_id, annotation_id)
+		);
+		CREATE INDEX idx_files_path ON files (path);
+		INSERT INTO files (path) VALUES ('src.txt');
+		INSERT INTO annotations (file_id, annotation_id, note_file) VALUES (1, 1, 'n1.md');
+		"""
+	)
+	conn.close()
+
+	manager = DatabaseManager(tmp_path)
+	try:
+		conn = manager._get_conn()
+		assert conn.execute("PRAGMA user_version").fetchone()[0] >= 1
+		indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+		assert "idx_annotations_file_aid" in indexes
+		assert "idx_files_path" not in indexes
+		assert manager.get_annotation_note_file(_uri(manager), 1) == "n1.md"
+	finally:
+		manager.close()
+
+	# 已是最新版本的数据库再次打开时不会重复迁移，数据保持不变
+	manager = DatabaseManager(tmp_path)
+	try:
+		assert manager.get_annotation_note_file(_uri(manager), 1) == "n1.md"
+	finally:
+		manager.close()
+
+
+def test_failed_delete_rolls_back_transaction(db):
+	_create(db, 3)
+	db._get_conn().execute(
+		"CREATE TRIGGER abort_delete BEFORE DELETE ON annotations "
+		"BEGIN SELECT RAISE(ABORT, 'delete failed'); END"
+	)
+
+	with pytest.raises(sqlite3.IntegrityError):
+		with db.transaction():
+			db.delete_annotation(_uri(db), 1)
+			db.increase_annotation_ids(_uri(db), 1, -1)
+
+	assert _ids(db) == [1, 2, 3]
+	assert db.delete_annotation(_uri(db), 1) is False
+
+
+def test_lookup_cache_sees_writes_from_another_connection(db):
+	_create(db, 2)
+	assert db.get_annotation_note_file(_uri(db), 1) == "n1.md"
+	assert db.get_note_files_from_source_uri(_uri(db)) == [
+		{"note_file": "n1.md"},
+		{"note_file": "n2.md"},
+	]
+
+	# 另一个语言服务器进程共享同一数据库
+	other = DatabaseManager(db.project_root)
+	try:
+		assert other.delete_annotation(_uri(other), 1)
+		assert other.increase_annotation_ids(_uri(other), 1, -1)
+	finally:
+		other.close()
+
+	assert db.get_annotation_note_file(_uri(db), 1) == "n2.md"
+	assert db.get_note_files_from_source_uri(_uri(db)) == [{"note_file": "n2.md"}]
@@ -0,0 +1,128 @@
+import frontmatter
+import pytest
+from pygls.workspace.text_document import TextDocument
+
+from annotation_ls_py.utils import (
+	extract_notes_content,
+	find_annotation_ranges,
+	invalidate_annotation_ranges,
+	parse_note,
+	read_frontmatter_head,
+	update_note_metadata,
+)
+
+# 本工具写出的笔记，必须走快速路径
+SIMPLE_NOTES = [
+	b"---\nfile: src/a b.py\nid: 3\n---\n\n## Selected Text\n```\nx\n```\n## Notes\nhi\n\n",
+	b"---\nfile: C:\\a\\b\nid: -4\n---\n  body ---\n---\nmore",
+	b"---\nfile: a:b\nid: +5\n---\nbody",
+	b"---\n---\nbody",
+]
+
+# 快速路径可以放弃（返回 None），但不能给出与 frontmatter 不同的结果
+ALL_NOTES = SIMPLE_NOTES + [
+	b"---\nfile:\nid: 1\n---\nbody",
+	b"---\nfile: \nid: 1\n---\nbody",
+	b"---\nfile: a.txt\t#c\nid: 1\n---\nbody",
+	b"---\nfile: a.txt #c\n---\n",
+	b"---\nfile: a:\tb\n---\n",
+	b"---\nfile: a:\n---\n",
+	b"---\nfile: 2024/a.md\nid: 3\n---\nx",
+	b"---\nfile: yes\nid: 010\n---\nx",
+	b"---\nfile: Null\nid: 1_0\n---\nx",
+	b"---\nfile: ~\nid: 1.5\n---\nx",
+	b"---\nfile: _x\ntags: [a]\n---\n",
+	b"---\nfile: a.txt\nid: 3 # moved\n---\n",
+	b"---\nfile: null\nid: 0x1A\n---\n",
+	b"no front matter",
+]
+
+
+@pytest.mark.parametrize("data", SIMPLE_NOTES)
+def test_parse_note_handles_simple_headers(data):
+	assert parse_note(data) is not None
+
+
+@pytest.mark.parametrize("data", ALL_NOTES)
+def test_parse_note_matches_frontmatter(data):
+	parsed = parse_note(data)
+	if parsed is None:
+		return
+	post = frontmatter.loads(data.decode("utf-8"))
+	assert parsed == (post.metadata, post.content)
+
+
+@pytest.mark.parametrize("data", ALL_NOTES)
+def test_read_frontmatter_head_matches_frontmatter(tmp_path, data):
+	note = tmp_path / "note.md"
+	note.write_bytes(data)
+	metadata = read_frontmatter_head(note)
+	if metadata is None:
+		return
+	post = frontmatter.loads(data.decode("utf-8"))
+	assert metadata == post.metadata
+	assert {k: type(v) for k, v in metadata.items()} == {
+		k: type(v) for k, v in post.metadata.items()
+	}
+
+
+@pytest.mark.parametrize(
+	"fields",
+	[
+		{"file": "src/b.py"},
+		{"id": 12},
+		{"file": "much/longer/path/than/before.py", "id": 7},
+		{"file": "12"},
+		{"file": "yes"},
+		{"file": "a.txt\t#c"},
+		{"file": "a: b"},
+		{"file": ".hidden/x.py"},
+		{"file": ""},
+	],
+)
+def test_update_note_metadata_round_trips(tmp_path, fields):
+	note = tmp_path / "note.md"
+	note.write_bytes(b"---\nfile: src/a.py\nid: 3\n---\n\n## Notes\nbody\n")
+
+	update_note_metadata(note, **fields)
+
+	post = frontmatter.load(str(note))
+	for key, value in fields.items():
+		assert post.metadata[key] == value
+	assert post.content == "## Notes\nbody"
+
+
+def test_invalidated_ranges_are_rescanned_for_reused_version():
+	uri = "file:///tmp/annotated.txt"
+	before = TextDocument(uri, "｢a｣ b", version=1)
+	after = TextDocument(uri, "c ｢d｣ ｢e｣", version=1)
+
+	assert find_annotation_ranges(before) == ((0, 0, 0, 2),)
+	# 版本号相同时缓存察觉不到内容变化，需要在打开、关闭文档时显式失效
+	assert find_annotation_ranges(after) == ((0, 0, 0, 2),)
+
+	invalidate_annotation_ranges(uri)
+	assert find_annotation_ranges(after) == ((0, 2, 0, 4), (0, 6, 0, 8))
+
+
+def _extract_by_lines(content):
+	lines = content.splitlines()
+	for i, line in enumerate(lines):
+		if line.strip() == "## Notes":
+			return "\n".join(lines[i + 1 :]).strip()
+	return ""
+
+
+@pytest.mark.parametrize(
+	"content",
+	[
+		"## Selected Text\n```\nx\n```\n## Notes\nfirst\n\nsecond\n",
+		"## Selected Text\r\n```\r\nx\r\n```\r\n## Notes\r\nfirst\r\n\r\nsecond\r\n",
+		"## Notes\rold mac\rline",
+		"  ## Notes   a b",
+		"no heading\r\n",
+	],
+)
+def test_extract_notes_content_splits_lines_like_splitlines(content):
+	assert extract_notes_content(content) == _extract_by_lines(content)
+	assert "\r" not in extract_notes_content(content)
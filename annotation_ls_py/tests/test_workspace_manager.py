@@ -0,0 +1,58 @@
+import os
+
+from annotation_ls_py import config
+from annotation_ls_py.config import AnnotationConfig
+from annotation_ls_py.workspace_manager import WorkspaceManager
+
+
+def test_lookup_uses_normcase_like_containment_checks(tmp_path, monkeypatch):
+	# 模拟大小写不敏感的文件系统（Windows 上的 normcase）
+	monkeypatch.setattr(os.path, "normcase", str.lower)
+	root = tmp_path / "Proj"
+	(root / ".annotation").mkdir(parents=True)
+	(root / "Sub" / ".annotation").mkdir(parents=True)
+
+	manager = WorkspaceManager()
+	workspace = manager.add_workspace(root.as_uri())
+	assert workspace is not None
+
+	lower_root = str(root).replace("Proj", "proj")
+	found = manager.get_workspace(f"file://{lower_root}/a.txt")
+	assert found is workspace
+
+	found = manager.get_workspace(f"file://{lower_root}/SUB/b.txt")
+	assert found is not None
+	assert found.root_path == root / "Sub"
+
+
+def test_find_subprojects_keeps_every_symlink_alias(tmp_path):
+	(tmp_path / "m_real" / "proj" / ".annotation").mkdir(parents=True)
+	(tmp_path / "z_link").symlink_to(tmp_path / "m_real", target_is_directory=True)
+	# 指向祖先目录的链接构成环，不能无限深入
+	(tmp_path / "m_real" / "loop").symlink_to(tmp_path, target_is_directory=True)
+	# 两个链接互相指向对方所在目录，也构成环
+	(tmp_path / "m_real" / "to_z").symlink_to(tmp_path / "z_link", target_is_directory=True)
+
+	found = WorkspaceManager()._find_subprojects(tmp_path)
+	assert sorted(found) == [tmp_path / "m_real" / "proj", tmp_path / "z_link" / "proj"]
+
+
+def test_real_path_resolves_when_also_reachable_through_symlink(tmp_path):
+	(tmp_path / "m_real" / "proj" / ".annotation").mkdir(parents=True)
+	(tmp_path / "z_link").symlink_to(tmp_path / "m_real", target_is_directory=True)
+
+	manager = WorkspaceManager()
+	manager.add_workspace(tmp_path.as_uri())
+	for base in ("m_real", "z_link"):
+		found = manager.get_workspace((tmp_path / base / "proj" / "f.txt").as_uri())
+		assert found is not None
+		assert found.root_path == tmp_path / base / "proj"
+
+
+def test_find_subprojects_uses_configured_ignored_dirs(tmp_path, monkeypatch):
+	(tmp_path / "vendor" / "proj" / ".annotation").mkdir(parents=True)
+	(tmp_path / "build" / "proj" / ".annotation").mkdir(parents=True)
+	monkeypatch.setattr(config, "_config", AnnotationConfig.from_dict({"ignoredDirs": ["vendor"]}))
+
+	found = WorkspaceManager()._find_subprojects(tmp_path)
+	assert found == [tmp_path / "build" / "proj"]